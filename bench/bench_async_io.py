@@ -0,0 +1,64 @@
+"""
+Serial versus overlapped (async) page builds with a simulated per-file
+read and write latency, standing in for a network filesystem.
+
+    python3 bench/bench_async_io.py [--latency-ms MS] [--io-workers N]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import async_build  # noqa: E402
+import generate_page  # noqa: E402
+from corpus import CorpusConfig, generate_corpus  # noqa: E402
+
+
+def with_latency(func, seconds):
+    def slow(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+
+    return slow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overlapped page I/O")
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--io-workers", type=int, default=8)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+    io_workers = args.io_workers
+
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        template_path = os.path.join(root, "template.html")
+        generate_corpus(content, CorpusConfig(pages=200))
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        # the serial build writes through write_page, the pipeline through
+        # write_output, slow both down by the same amount
+        generate_page.read_markdown = with_latency(generate_page.read_markdown, latency)
+        generate_page.write_page = with_latency(generate_page.write_page, latency)
+        async_build.write_output = with_latency(async_build.write_output, latency)
+
+        print(f"200 pages, {latency * 1000:.1f} ms per read and write")
+        for label, workers in (("serial", 0), (f"async-io {io_workers}", io_workers)):
+            dest = os.path.join(root, label.replace(" ", "-"))
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                generate_page.generate_pages_recursive(
+                    content, template_path, dest, "/", io_workers=workers
+                )
+            print(f"{label:<12} {time.perf_counter() - start:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Per-block cost of block_to_block_type against the previous
+implementation (uncompiled re.match, up to three all() scans) on
+list-heavy documents.
+
+    python3 bench/bench_classify.py
+"""
+
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import CorpusConfig, generate_block, list_block  # noqa: E402
+from markdown_functions import BlockType, block_to_block_type  # noqa: E402
+
+
+def previous_block_to_block_type(block):
+    lines = block.splitlines()
+    if re.match(r"#{1,6}\s[\w\s]+", block):
+        return BlockType.HEADING
+    elif re.match(r"`{3}([\s\S]*?)`{3}", block):
+        return BlockType.CODE
+    elif all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    elif all(line.startswith("- ") for line in lines):
+        return BlockType.ULIST
+    elif all(line.startswith(f"{i}. ") for i, line in enumerate(lines, start=1)):
+        return BlockType.OLIST
+    else:
+        return BlockType.PARAGRAPH
+
+
+def main():
+    rng = random.Random(0)
+    config = CorpusConfig(list_depth=1)
+    mixes = {
+        "lists": [list_block(rng, config) for _ in range(5000)],
+        "long lists": [
+            "\n".join(list_block(rng, config) for _ in range(10)) for _ in range(500)
+        ],
+        "mixed": [generate_block(rng, config) for _ in range(5000)],
+    }
+
+    print(f"{'document':<12} {'before (us)':>12} {'after (us)':>12} {'speedup':>8}")
+    for name, blocks in mixes.items():
+        for block in blocks:
+            assert block_to_block_type(block) == previous_block_to_block_type(block)
+
+        before = min(
+            timeit.repeat(
+                lambda: [previous_block_to_block_type(b) for b in blocks],
+                number=5,
+                repeat=3,
+            )
+        )
+        after = min(
+            timeit.repeat(
+                lambda: [block_to_block_type(b) for b in blocks], number=5, repeat=3
+            )
+        )
+        before_us = before / 5 / len(blocks) * 1e6
+        after_us = after / 5 / len(blocks) * 1e6
+        speedup = before_us / after_us
+        print(f"{name:<12} {before_us:>12.2f} {after_us:>12.2f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the single pass inline scanner with the old five stage
+split_nodes pipeline on long paragraphs.
+
+    python3 bench/bench_inline.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from markdown_functions import (  # noqa: E402
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType  # noqa: E402
+
+SENTENCE = (
+    "This is **bold text** with an _italic_ word, some `inline code`, "
+    "an ![image](https://example.com/a.png) and a [link](https://example.com). "
+)
+
+
+def split_pipeline(text):
+    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+def main():
+    print(f"{'sentences':>10} {'split (ms)':>12} {'scan (ms)':>12} {'speedup':>8}")
+    for count in (10, 100, 1000, 5000):
+        text = SENTENCE * count
+        assert split_pipeline(text) == text_to_textnodes(text)
+
+        number = max(1, 2000 // count)
+        split = min(
+            timeit.repeat(lambda: split_pipeline(text), number=number, repeat=3)
+        )
+        scan = min(
+            timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)
+        )
+        split_ms = split / number * 1000
+        scan_ms = scan / number * 1000
+        ratio = split_ms / scan_ms
+        print(f"{count:>10} {split_ms:>12.3f} {scan_ms:>12.3f} {ratio:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
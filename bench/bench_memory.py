@@ -0,0 +1,114 @@
+"""
+Measures bytes per node for the slot based TextNode and HTMLNode
+classes against equivalent __dict__ based classes on a synthetic
+10 MB markdown corpus.
+
+    python3 bench/bench_memory.py [--size-mb MB]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import CorpusConfig, generate_markdown  # noqa: E402
+from htmlnode import LeafNode, ParentNode  # noqa: E402
+from markdown_functions import (  # noqa: E402
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+from textnode import TextNode  # noqa: E402
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def copy_html(node, leaf_cls, parent_cls):
+    if node.children is None:
+        return leaf_cls(node.tag, node.value, node.props)
+    children = [copy_html(child, leaf_cls, parent_cls) for child in node.children]
+    return parent_cls(node.tag, children, node.props)
+
+
+def walk(node):
+    yield node
+    for child in node.children or ():
+        yield from walk(child)
+
+
+def measure(build):
+    """
+    Returns the bytes still allocated by the object build() returns
+    """
+    tracemalloc.start()
+    result = build()  # noqa: F841
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark node memory use")
+    parser.add_argument("--size-mb", type=float, default=10)
+    args = parser.parse_args()
+
+    config = CorpusConfig(page_size=int(args.size_mb * 1024 * 1024), code_ratio=0)
+    markdown = generate_markdown(random.Random(config.seed), config)
+    tree = markdown_to_html_node(markdown)
+    textnodes = [
+        node
+        for block in markdown_to_blocks(markdown)
+        for node in text_to_textnodes(block)
+    ]
+    html_count = sum(1 for _ in walk(tree))
+    text_count = len(textnodes)
+
+    print(
+        f"corpus: {len(markdown) / 1024 / 1024:.1f} MB, "
+        f"{html_count} html nodes, {text_count} text nodes"
+    )
+    print(f"{'class':<12} {'dict (B/node)':>14} {'slots (B/node)':>15}")
+
+    dict_size = measure(
+        lambda: copy_html(
+            tree,
+            lambda tag, value, props: DictHTMLNode(tag, value, None, props),
+            lambda tag, children, props: DictHTMLNode(tag, None, children, props),
+        )
+    )
+    slot_size = measure(lambda: copy_html(tree, LeafNode, ParentNode))
+    print(
+        f"{'HTMLNode':<12} {dict_size / html_count:>14.1f} "
+        f"{slot_size / html_count:>15.1f}"
+    )
+
+    dict_size = measure(
+        lambda: [DictTextNode(n.text, n.text_type, n.url) for n in textnodes]
+    )
+    slot_size = measure(
+        lambda: [TextNode(n.text, n.text_type, n.url) for n in textnodes]
+    )
+    print(
+        f"{'TextNode':<12} {dict_size / text_count:>14.1f} "
+        f"{slot_size / text_count:>15.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
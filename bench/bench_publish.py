@@ -0,0 +1,59 @@
+"""
+Compares the asset publishing strategies on a synthetic image tree.
+
+    python3 bench/bench_publish.py [--files N] [--size BYTES] [--dest DIR]
+
+--dest lets the destination live on another volume, where hardlink and
+reflink are not available.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import generate_assets  # noqa: E402
+from generate_page import copy_assets  # noqa: E402
+from publish import STRATEGIES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark asset publishing")
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--size", type=int, default=1024 * 1024)
+    parser.add_argument("--dest", help="directory for the published trees")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        static = os.path.join(root, "static")
+        generate_assets(static, args.files, args.size)
+        total_mb = args.files * args.size / 1024 / 1024
+        print(f"{args.files} files, {total_mb:.0f} MB")
+        print(f"{'strategy':<16} {'time (ms)':>10} {'MB/s':>10}")
+
+        for strategy in STRATEGIES:
+            dest = os.path.join(args.dest or root, f"published-{strategy}")
+            shutil.rmtree(dest, ignore_errors=True)
+            os.makedirs(dest)
+            start = time.perf_counter()
+            try:
+                # failures print one line per file, the table only needs one
+                with redirect_stdout(io.StringIO()):
+                    copy_assets(static, dest, strategy=strategy)
+                elapsed = time.perf_counter() - start
+            except OSError as e:
+                print(f"{strategy:<16} {'unsupported':>10} ({e.strerror})")
+                continue
+            finally:
+                shutil.rmtree(dest)
+            print(f"{strategy:<16} {elapsed * 1000:>10.1f} {total_mb / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
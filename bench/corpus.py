@@ -0,0 +1,168 @@
+"""
+Deterministic synthetic markdown corpora for the benchmarks.
+
+    python3 bench/corpus.py OUT_DIR [--pages N] [--page-size BYTES] ...
+"""
+
+import argparse
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in mount doom by sauron long ago while "
+    "elves and dwarves and men of the west watched from afar"
+).split()
+
+
+class CorpusConfig:
+    """
+    Shape of a synthetic corpus
+
+    inline_density: chance that a word carries inline markup
+    list_depth: maximum nesting depth of generated lists
+    code_ratio: share of blocks that are fenced code blocks
+    """
+
+    def __init__(
+        self,
+        pages=200,
+        page_size=8 * 1024,
+        inline_density=0.1,
+        list_depth=1,
+        code_ratio=0.1,
+        seed=0,
+    ):
+        self.pages = pages
+        self.page_size = page_size
+        self.inline_density = inline_density
+        self.list_depth = list_depth
+        self.code_ratio = code_ratio
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def inline_words(rng, count, density):
+    words = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        if rng.random() < density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"_{word}_"
+            elif kind == 2:
+                word = f"`{word}`"
+            elif kind == 3:
+                word = f"[{word}](/blog/{word})"
+            else:
+                word = f"![{word}](/images/{word}.png)"
+        words.append(word)
+    return " ".join(words)
+
+
+def list_block(rng, config):
+    ordered = rng.random() < 0.3
+    lines = []
+    for i in range(rng.randint(3, 8)):
+        depth = rng.randint(0, config.list_depth - 1) if lines else 0
+        marker = f"{i + 1}." if ordered and depth == 0 else "-"
+        text = inline_words(rng, rng.randint(4, 12), config.inline_density)
+        lines.append(f"{'  ' * depth}{marker} {text}")
+    return "\n".join(lines)
+
+
+def code_block(rng):
+    lines = [
+        f"{rng.choice(WORDS)} = {rng.choice(WORDS)}_{i}(**args) # _not_ markup"
+        for i in range(rng.randint(3, 15))
+    ]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def generate_block(rng, config):
+    roll = rng.random()
+    if roll < config.code_ratio:
+        return code_block(rng)
+    roll = rng.random()
+    if roll < 0.1:
+        return f"## {inline_words(rng, rng.randint(2, 6), 0)}"
+    if roll < 0.2:
+        lines = rng.randint(1, 4)
+        return "\n".join(
+            f"> {inline_words(rng, 10, config.inline_density)}" for _ in range(lines)
+        )
+    if roll < 0.4:
+        return list_block(rng, config)
+    return inline_words(rng, rng.randint(20, 120), config.inline_density)
+
+
+def generate_markdown(rng, config, title="Synthetic page"):
+    """
+    Returns one page of roughly config.page_size characters
+    """
+    blocks = [f"# {title}"]
+    size = len(blocks[0])
+    while size < config.page_size:
+        block = generate_block(rng, config)
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def generate_corpus(content_dir, config):
+    """
+    Writes config.pages pages below content_dir, spread over nested
+    sections, and returns their paths
+    """
+    rng = random.Random(config.seed)
+    paths = []
+    for i in range(config.pages):
+        section = os.path.join(content_dir, f"section{i % 10}", f"page{i}")
+        os.makedirs(section, exist_ok=True)
+        path = os.path.join(section, "index.md")
+        with open(path, "w") as f:
+            f.write(generate_markdown(rng, config, f"Page {i}"))
+        paths.append(path)
+    return paths
+
+
+def generate_assets(static_dir, files=200, size=16 * 1024, seed=0):
+    """
+    Writes a tree of binary assets below static_dir
+    """
+    rng = random.Random(seed)
+    for i in range(files):
+        folder = os.path.join(static_dir, "images", f"set{i % 8}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"img{i}.png"), "wb") as f:
+            f.write(rng.randbytes(size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus")
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=8 * 1024)
+    parser.add_argument("--inline-density", type=float, default=0.1)
+    parser.add_argument("--list-depth", type=int, default=1)
+    parser.add_argument("--code-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = CorpusConfig(
+        args.pages,
+        args.page_size,
+        args.inline_density,
+        args.list_depth,
+        args.code_ratio,
+        args.seed,
+    )
+    generate_corpus(os.path.join(args.out_dir, "content"), config)
+    print(f"Wrote {config.pages} pages to {args.out_dir}/content")
+
+
+if __name__ == "__main__":
+    main()
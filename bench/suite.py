@@ -0,0 +1,178 @@
+"""
+Times every pipeline stage on deterministic synthetic corpora and
+compares the results with a stored baseline.
+
+    python3 bench/suite.py                  # compare with bench/baseline.json
+    python3 bench/suite.py --save-baseline  # record a new baseline
+    python3 bench/suite.py --corpus lists --threshold 0.1
+
+Exits with status 1 when a stage is slower than its baseline by more
+than the threshold. Baselines are machine specific, record them on the
+machine that runs the comparison.
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import CorpusConfig, generate_assets, generate_corpus  # noqa: E402
+from generate_page import copy_assets, generate_pages_recursive  # noqa: E402
+from markdown_functions import (  # noqa: E402
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css">{{ Content }}'
+
+CORPORA = {
+    "default": CorpusConfig(),
+    "inline-heavy": CorpusConfig(inline_density=0.4),
+    "lists": CorpusConfig(list_depth=3),
+    "code-heavy": CorpusConfig(code_ratio=0.5),
+    "large-pages": CorpusConfig(pages=10, page_size=256 * 1024),
+}
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_corpus(config, repeat):
+    """
+    Returns {stage: best wall time in seconds} for one corpus
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        static = os.path.join(root, "static")
+        template_path = os.path.join(root, "template.html")
+        paths = generate_corpus(content, config)
+        generate_assets(static, seed=config.seed)
+        with open(template_path, "w") as f:
+            f.write(TEMPLATE)
+
+        pages = []
+        for path in paths:
+            with open(path, "r") as f:
+                pages.append(f.read())
+        blocks = [block for page in pages for block in markdown_to_blocks(page)]
+        inline = [
+            " ".join(block.split())
+            for block in blocks
+            if block_to_block_type(block) != BlockType.CODE
+        ]
+        trees = [markdown_to_html_node(page) for page in pages]
+
+        results["block_splitting"] = best_of(
+            repeat, lambda: [markdown_to_blocks(page) for page in pages]
+        )
+        results["block_classification"] = best_of(
+            repeat, lambda: [block_to_block_type(block) for block in blocks]
+        )
+        results["inline_parsing"] = best_of(
+            repeat, lambda: [text_to_textnodes(text) for text in inline]
+        )
+        results["html_serialization"] = best_of(
+            repeat, lambda: [tree.to_html() for tree in trees]
+        )
+
+        def full_build():
+            dest = os.path.join(root, "docs")
+            shutil.rmtree(dest, ignore_errors=True)
+            with redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content, template_path, dest, "/")
+
+        def asset_copy():
+            dest = os.path.join(root, "assets")
+            shutil.rmtree(dest, ignore_errors=True)
+            os.makedirs(dest)
+            copy_assets(static, dest)
+
+        results["generate_pages_recursive"] = best_of(repeat, full_build)
+        results["asset_copying"] = best_of(repeat, asset_copy)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns the (corpus, stage, baseline, current) rows that regressed
+    """
+    regressions = []
+    for name, stages in results.items():
+        for stage, seconds in stages.items():
+            base = baseline.get(name, {}).get(stage)
+            if base and seconds > base * (1 + threshold):
+                regressions.append((name, stage, base, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the build pipeline")
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=sorted(CORPORA),
+        help="corpus to run, may be repeated (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown before a stage fails, 0.2 = 20%% (default)",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name in args.corpus or CORPORA:
+        results[name] = run_corpus(CORPORA[name], args.repeat)
+        print(f"\n{name}: {CORPORA[name].to_dict()}")
+        print(f"{'stage':<26} {'time (ms)':>10} {'baseline':>10} {'change':>8}")
+        for stage, seconds in results[name].items():
+            base = baseline.get(name, {}).get(stage)
+            change = f"{(seconds / base - 1) * 100:+.1f}%" if base else "-"
+            base_ms = f"{base * 1000:.2f}" if base else "-"
+            print(f"{stage:<26} {seconds * 1000:>10.2f} {base_ms:>10} {change:>8}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%}:")
+        for name, stage, base, seconds in regressions:
+            print(f"  {name}/{stage}: {base * 1000:.2f} -> {seconds * 1000:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
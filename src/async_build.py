@@ -0,0 +1,118 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import generate_page
+
+DEFAULT_IO_WORKERS = 8
+
+
+def read_source(src_path):
+    """
+    Returns the markdown of src_path, or None for pages large enough to
+    be streamed, which are read while rendering instead
+    """
+    if os.path.getsize(src_path) > generate_page.STREAM_THRESHOLD:
+        return None
+    return generate_page.read_markdown(src_path)
+
+
+def write_output(dest_path, html):
+    with generate_page.open_output(dest_path) as dest:
+        dest.write(html)
+
+
+async def run_pipeline(
+    pages, templates, basepath, io_workers, queue_size, manifest, cache
+):
+    """
+    Reads, renders and writes pages as three stages joined by bounded
+    queues. Reads and writes run on a thread pool, so up to queue_size
+    pages are read ahead and written behind while the event loop thread
+    renders the current one. Returns the error messages in page order.
+    """
+    loop = asyncio.get_running_loop()
+    reads = asyncio.Queue(queue_size)
+    writes = asyncio.Queue(queue_size)
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+
+        async def read_stage():
+            for index, (src_path, dest_path) in enumerate(pages):
+                future = loop.run_in_executor(io_pool, read_source, src_path)
+                await reads.put((index, src_path, dest_path, future))
+            await reads.put(None)
+
+        async def render_stage():
+            while (item := await reads.get()) is not None:
+                index, src_path, dest_path, future = item
+                template_path = templates.path_for(src_path)
+                print(
+                    f"Generating page from {src_path} to {dest_path} "
+                    f"using {template_path}"
+                )
+                try:
+                    template = templates.get(template_path)
+                    markdown = await future
+                    if markdown is None:
+                        generate_page.stream_page(
+                            src_path, template, dest_path, basepath
+                        )
+                        future = None
+                    else:
+                        title = generate_page.extract_title(markdown)
+                        node = generate_page.parse_markdown(markdown, cache)
+                        html = "".join(
+                            template.iter_render(
+                                Title=title, Content=node.iter_html(basepath)
+                            )
+                        )
+                        future = loop.run_in_executor(
+                            io_pool, write_output, dest_path, html
+                        )
+                except Exception as e:
+                    errors.append((index, f"{src_path}: {e}"))
+                    continue
+                await writes.put((index, src_path, dest_path, future))
+            await writes.put(None)
+
+        async def write_stage():
+            while (item := await writes.get()) is not None:
+                index, src_path, dest_path, future = item
+                try:
+                    if future is not None:
+                        await future
+                except Exception as e:
+                    errors.append((index, f"{src_path}: {e}"))
+                    continue
+                if manifest:
+                    manifest.record("pages", src_path, dest_path)
+
+        await asyncio.gather(read_stage(), render_stage(), write_stage())
+
+    return [message for _, message in sorted(errors)]
+
+
+def generate_pages_async(
+    pages,
+    templates,
+    basepath,
+    io_workers=DEFAULT_IO_WORKERS,
+    *,
+    manifest=None,
+    cache=None,
+):
+    """
+    Renders pages in order while file reads and writes overlap with the
+    rendering, for content on slow or network filesystems
+    """
+    errors = asyncio.run(
+        run_pipeline(
+            pages, templates, basepath, io_workers, io_workers * 2, manifest, cache
+        )
+    )
+    if errors:
+        raise Exception(
+            f"{len(errors)} page(s) failed to build:\n" + "\n".join(errors)
+        )
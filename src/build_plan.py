@@ -0,0 +1,188 @@
+import os
+from fnmatch import fnmatchcase
+
+from template import TEMPLATE_NAME
+
+
+class BuildPlan:
+    """
+    Every page and asset a build reads and writes, found by a single
+    os.scandir walk over the content and static trees. The plan is
+    built once and only read afterwards, all its fields are tuples.
+
+    pages, assets: sorted (source, destination) pairs
+    page_dirs, asset_dirs: output directories, parents first
+    collisions: (destination, sources) for every destination that more
+    than one page or asset would be written to
+    """
+
+    __slots__ = ("pages", "assets", "page_dirs", "asset_dirs", "collisions")
+
+    def __init__(self, pages, assets, page_dirs, asset_dirs, collisions):
+        self.pages = pages
+        self.assets = assets
+        self.page_dirs = page_dirs
+        self.asset_dirs = asset_dirs
+        self.collisions = collisions
+
+    def check_collisions(self):
+        if not self.collisions:
+            return
+        lines = [
+            f"{dest_path} from {', '.join(sources)}"
+            for dest_path, sources in self.collisions
+        ]
+        raise Exception(
+            f"{len(lines)} output path collision(s):\n" + "\n".join(lines)
+        )
+
+
+class PathFilter:
+    """
+    --only/--exclude glob filter over paths relative to the content
+    directory, using "/" as separator. * also matches "/", and a pattern
+    that matches a directory applies to everything below it, so
+    "blog" and "blog/*" both select the whole blog section.
+    """
+
+    def __init__(self, only=(), exclude=()):
+        self.only = tuple(only)
+        self.exclude = tuple(exclude)
+
+    def matches(self, patterns, rel_path):
+        return any(fnmatchcase(rel_path, pattern) for pattern in patterns)
+
+    def excluded(self, rel_path):
+        return self.matches(self.exclude, rel_path)
+
+    def included(self, rel_path):
+        return not self.only or self.matches(self.only, rel_path)
+
+    def may_contain(self, rel_dir):
+        """
+        True if a path below rel_dir could match an --only pattern, judged
+        by the literal part of each pattern before its first wildcard
+        """
+        prefix = rel_dir + "/"
+        for pattern in self.only:
+            literal = pattern
+            for i, char in enumerate(pattern):
+                if char in "*?[":
+                    literal = pattern[:i]
+                    break
+            if literal.startswith(prefix) or prefix.startswith(literal):
+                return True
+        return False
+
+    def below(self, rel_dir):
+        """
+        Returns the filter for the contents of rel_dir, None to skip the
+        directory altogether
+        """
+        if self.excluded(rel_dir) or self.excluded(rel_dir + "/"):
+            return None
+        if self.only and (self.included(rel_dir) or self.included(rel_dir + "/")):
+            return PathFilter(exclude=self.exclude)
+        if self.only and not self.may_contain(rel_dir):
+            return None
+        return self
+
+
+def walk_assets(src, dest):
+    """
+    Walks src once with os.scandir and returns the destination
+    directories and the (source, destination) pairs of every file
+    """
+    dirs = []
+    files = []
+    stack = [(src, dest)]
+    while stack:
+        src_dir, dest_dir = stack.pop()
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                dest_path = os.path.join(dest_dir, entry.name)
+                if entry.is_dir():
+                    dirs.append(dest_path)
+                    stack.append((entry.path, dest_path))
+                elif entry.is_file():
+                    files.append((entry.path, dest_path))
+
+    return dirs, files
+
+
+def collect_pages(dir_path_content, dest_dir_path, path_filter=None, rel_dir=""):
+    """
+    Walks the content tree once and returns a sorted list of
+    (source, destination) pairs for every page. Section templates are
+    not pages. Directories path_filter rules out are not entered.
+    """
+    pages = []
+    with os.scandir(dir_path_content) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        if entry.is_dir():
+            sub_filter = path_filter and path_filter.below(rel_path)
+            if path_filter and sub_filter is None:
+                continue
+            dest_path = os.path.join(dest_dir_path, entry.name)
+            pages.extend(collect_pages(entry.path, dest_path, sub_filter, rel_path))
+        elif entry.is_file() and entry.name != TEMPLATE_NAME:
+            if path_filter and (
+                path_filter.excluded(rel_path) or not path_filter.included(rel_path)
+            ):
+                continue
+            dest_filename = entry.name.replace(".md", ".html")
+            pages.append((entry.path, os.path.join(dest_dir_path, dest_filename)))
+
+    return pages
+
+
+def page_dest_path(src_path, content_dir, dest_dir):
+    rel_path = os.path.relpath(src_path, content_dir)
+    head, item = os.path.split(rel_path)
+    return os.path.join(dest_dir, head, item.replace(".md", ".html"))
+
+
+def plan_build(content_dir, static_dir, dest_dir, path_filter=None):
+    """
+    Scans content_dir and, unless it is None, static_dir into a BuildPlan
+    for dest_dir. path_filter narrows down the pages.
+    """
+    pages = collect_pages(content_dir, dest_dir, path_filter)
+    asset_dirs, assets = [], []
+    if static_dir is not None:
+        asset_dirs, assets = walk_assets(static_dir, dest_dir)
+    page_dirs = {os.path.dirname(dest_path) for _, dest_path in pages}
+
+    sources = {}
+    for src_path, dest_path in pages + assets:
+        sources.setdefault(dest_path, []).append(src_path)
+    collisions = tuple(
+        (dest_path, tuple(paths))
+        for dest_path, paths in sorted(sources.items())
+        if len(paths) > 1
+    )
+
+    return BuildPlan(
+        tuple(pages),
+        tuple(sorted(assets)),
+        tuple(sorted(page_dirs)),
+        tuple(sorted(asset_dirs)),
+        collisions,
+    )
+
+
+def make_dirs(dirs):
+    """
+    Creates a batch of directories sorted parents first with a single
+    mkdir each, only falling back to makedirs for missing ancestors
+    """
+    for dir_path in dirs:
+        try:
+            os.mkdir(dir_path)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(dir_path, exist_ok=True)
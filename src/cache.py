@@ -0,0 +1,81 @@
+import hashlib
+import os
+import pickle
+
+from manifest import GENERATOR_VERSION
+
+CACHE_DIR = ".ssg-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed markdown documents keyed by the hash of the
+    markdown and the generator version. The cached HTMLNode tree does not
+    depend on the template or basepath, so those can change without
+    re-parsing. Entries are evicted least recently used first once the
+    cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, markdown):
+        digest = hashlib.sha256()
+        digest.update(GENERATOR_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(markdown.encode())
+        key = digest.hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".pickle")
+
+    def get(self, markdown):
+        path = self.path_for(markdown)
+        try:
+            with open(path, "rb") as f:
+                node = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            self.misses += 1
+            return None
+
+        # the mtime doubles as the last use time for LRU eviction
+        os.utime(path)
+        self.hits += 1
+        return node
+
+    def put(self, markdown, node):
+        path = self.path_for(markdown)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(node, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in
+        max_bytes and returns the number of removed entries
+        """
+        entries = []
+        total = 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+
+        return removed
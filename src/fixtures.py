@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+TEMPLATE = "<title>{{ Title }}</title><a href=\"/x\">{{ Content }}</a>"
+
+
+def write(path, data):
+    """
+    Writes text, or bytes in binary mode, creating missing directories
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+
+def read(path, mode="r"):
+    with open(path, mode) as f:
+        return f.read()
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Gives every test a fresh temporary directory as self.tmp, removed
+    once the test is done
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
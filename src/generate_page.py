@@ -1,6 +1,43 @@
+import glob
+import hashlib
+import io
+import mmap
 import os
 import shutil
-from markdown_functions import markdown_to_html_node
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from build_plan import (
+    PathFilter,
+    make_dirs,
+    page_dest_path,
+    plan_build,
+    walk_assets,
+)
+from contextlib import contextmanager, redirect_stdout
+from itertools import chain
+from htmlnode import ParentNode
+from markdown_functions import (
+    block_memo,
+    extract_markdown_images,
+    iter_block_nodes,
+    iter_blocks,
+    iter_buffer_blocks,
+    markdown_to_html_node,
+)
+from git_changes import changed_files
+from manifest import BuildManifest, hash_file
+from publish import publish_file
+from template import TEMPLATE_NAME, TemplateSet
+
+# pages larger than this are streamed block by block and skip the cache
+STREAM_THRESHOLD = 16 * 1024 * 1024
+# stands in for the basepath while a body is serialized for several targets
+BASEPATH_PLACEHOLDER = "\0"
 
 
 def delete_contents(dest):
@@ -14,21 +51,155 @@ def delete_contents(dest):
             os.remove(item_path)
 
 
-def copy_assets(src, dest):
-    for item in os.listdir(src):
-        src_path = os.path.join(src, item)
-        dest_path = os.path.join(dest, item)
+def copy_file(src_path, dest_path, strategy="auto"):
+    publish_file(src_path, dest_path, strategy)
+
+
+def run_file_jobs(func, files, workers, label):
+    """
+    Runs func(src_path, dest_path) for every file on a pool of at most
+    workers threads, with at most 2 * workers jobs queued at a time.
+    Prints progress and every failure, and returns the results of the
+    successful jobs as {(src_path, dest_path): result}. If every failure
+    is an OSError the raised error is one too, with the errno of the
+    first, so callers can still tell an unsupported filesystem apart.
+    """
+    results = {}
+    failures = []
+    errors = []
+    step = max(1, len(files) // 10)
+
+    def done(job, result, error=None):
+        if error is not None:
+            failures.append(job)
+            errors.append(error)
+            print(f"Error: {label} {job[0]} -> {job[1]}: {error}")
+        else:
+            results[job] = result
+        finished = len(results) + len(failures)
+        if len(files) >= 100 and finished % step == 0:
+            print(f"{label}: {finished}/{len(files)}")
+
+    if workers <= 1:
+        for job in files:
+            try:
+                done(job, func(*job))
+            except Exception as e:
+                done(job, None, e)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            jobs = iter(files)
+            while True:
+                for job in jobs:
+                    pending[pool.submit(func, *job)] = job
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = pending.pop(future)
+                    error = future.exception()
+                    done(job, None if error else future.result(), error)
+
+    if failures:
+        message = f"{len(failures)} file(s) failed: {label}"
+        if all(isinstance(error, OSError) for error in errors):
+            first = errors[0]
+            raise OSError(first.errno, f"{message} ({first.strerror or first})")
+        raise Exception(message)
+    return results
+
+
+def copy_assets(
+    src, dest, *, manifest=None, strategy="auto", workers=1, plan=None
+):
+    if plan is None:
+        dirs, files = walk_assets(src, dest)
+    else:
+        dirs, files = plan.asset_dirs, plan.assets
+    make_dirs(dirs)
+
+    if manifest:
+        files = [
+            (src_path, dest_path)
+            for src_path, dest_path in files
+            if manifest.needs_build("assets", src_path, dest_path)
+        ]
 
-        if os.path.isdir(src_path):
-            os.makedirs(dest_path, exist_ok=True)
-            copy_assets(src_path, dest_path)
-        elif os.path.isfile(src_path):
-            shutil.copy(src_path, dest_path)
+    copied = run_file_jobs(
+        lambda src_path, dest_path: copy_file(src_path, dest_path, strategy),
+        files,
+        workers,
+        "copying assets",
+    )
+    if manifest:
+        for src_path, dest_path in copied:
+            manifest.record("assets", src_path, dest_path)
 
 
-def move_assets(src, dest):
+def move_assets(src, dest, *, strategy="auto", workers=1, plan=None):
     delete_contents(dest)
-    copy_assets(src, dest)
+    copy_assets(src, dest, strategy=strategy, workers=workers, plan=plan)
+
+
+def file_changed(src_path, dest_path, checksum=False):
+    """
+    Compares size, then the content hash when checksum is set, otherwise
+    the mtime that copy_file preserves
+    """
+    try:
+        dest_st = os.stat(dest_path)
+    except FileNotFoundError:
+        return True
+
+    src_st = os.stat(src_path)
+    if src_st.st_size != dest_st.st_size:
+        return True
+    if checksum:
+        return hash_file(src_path) != hash_file(dest_path)
+    return src_st.st_mtime_ns != dest_st.st_mtime_ns
+
+
+def sync_assets(
+    src, dest, *, checksum=False, keep=(), strategy="auto", workers=1, plan=None
+):
+    """
+    rsync style asset publishing: copies only new or changed files and
+    deletes files in dest that are neither assets nor listed in keep.
+    Returns the number of copied, unchanged and deleted files.
+    """
+    if plan is None:
+        dirs, files = walk_assets(src, dest)
+    else:
+        dirs, files = plan.asset_dirs, plan.assets
+    os.makedirs(dest, exist_ok=True)
+    make_dirs(dirs)
+
+    def sync_file(src_path, dest_path):
+        if not file_changed(src_path, dest_path, checksum):
+            return False
+        copy_file(src_path, dest_path, strategy)
+        return True
+
+    results = run_file_jobs(sync_file, files, workers, "syncing assets")
+    copied = sum(results.values())
+    unchanged = len(results) - copied
+
+    expected = set(keep)
+    expected.update(dest_path for _, dest_path in files)
+    deleted = 0
+    for dir_path, dir_names, file_names in os.walk(dest, topdown=False):
+        for name in file_names:
+            path = os.path.join(dir_path, name)
+            if path not in expected:
+                os.remove(path)
+                deleted += 1
+        if dir_path != dest and not os.listdir(dir_path):
+            os.rmdir(dir_path)
+
+    return copied, unchanged, deleted
 
 
 def extract_title(markdown):
@@ -42,37 +213,749 @@ def extract_title(markdown):
         return first_line.strip("#").strip()
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+def read_markdown(from_path):
+    with open(from_path, "r") as mk:
+        return mk.read()
+
+
+class OutputStats:
+    """
+    Counts the pages written and the ones left untouched because their
+    html did not change. Pages are written from several threads with
+    --async-io, so updates are locked.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.written = 0
+        self.unchanged = 0
+
+    def add(self, written):
+        with self.lock:
+            if written:
+                self.written += 1
+            else:
+                self.unchanged += 1
+
+    def clear(self):
+        self.written = 0
+        self.unchanged = 0
+
+
+output_stats = OutputStats()
+
+
+class OutputFile:
+    """
+    Write-only text file for one page. The html is encoded, counted and
+    hashed as it is produced and held in memory, so an output that turns
+    out identical to the existing file is never written at all. Pages
+    growing past STREAM_THRESHOLD spill into a temporary file next to
+    dest_path instead, to keep streamed pages out of memory.
+    """
+
+    # characters gathered before they are encoded and hashed in one go
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, dest_path):
+        self.dest_path = dest_path
+        self.tmp_path = f"{dest_path}.output-tmp"
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.pending = []
+        self.pending_size = 0
+        self.chunks = []
+        self.tmp = None
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.CHUNK_SIZE:
+            self.flush()
+
+    def writelines(self, lines):
+        for text in lines:
+            self.write(text)
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = "".join(self.pending).encode()
+        self.pending = []
+        self.pending_size = 0
+        self.digest.update(data)
+        self.size += len(data)
+        if self.tmp is not None:
+            self.tmp.write(data)
+            return
+        self.chunks.append(data)
+        if self.size > STREAM_THRESHOLD:
+            self.open_tmp()
+
+    def open_tmp(self):
+        """
+        Opens the temporary file and moves the buffered html into it. The
+        build plan creates the output directories up front, so makedirs
+        only runs when one is missing.
+        """
+        try:
+            self.tmp = open(self.tmp_path, "wb")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.dest_path), exist_ok=True)
+            self.tmp = open(self.tmp_path, "wb")
+        self.tmp.writelines(self.chunks)
+        self.chunks = []
+
+    def unchanged(self):
+        try:
+            st = os.stat(self.dest_path)
+        except FileNotFoundError:
+            return False
+        if st.st_size != self.size:
+            return False
+        return hash_file(self.dest_path) == self.digest.hexdigest()
+
+    def commit(self):
+        """
+        Moves the html into place unless dest_path already holds the same
+        bytes, and returns whether it was written
+        """
+        self.flush()
+        if self.unchanged():
+            return False
+        if self.tmp is None:
+            self.open_tmp()
+        self.tmp.close()
+        os.replace(self.tmp_path, self.dest_path)
+        return True
+
+    def discard(self):
+        if self.tmp is not None:
+            self.tmp.close()
+            if os.path.lexists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+@contextmanager
+def open_output(dest_path):
+    """
+    Yields an OutputFile for dest_path. On success the html replaces
+    dest_path atomically, unless dest_path already has the same size and
+    content hash, which is then left untouched, mtime included.
+    """
+    output = OutputFile(dest_path)
+    try:
+        yield output
+        written = output.commit()
+    finally:
+        output.discard()
+    output_stats.add(written)
+
+
+def write_page(dest_path, template, title, node, basepath):
+    """
+    Streams the filled template with the serialized node into dest_path
+    """
+    with open_output(dest_path) as dest:
+        dest.writelines(
+            template.iter_render(Title=title, Content=node.iter_html(basepath))
+        )
+
+
+def parse_markdown(markdown, cache=None):
+    """
+    Parses markdown into an HTMLNode tree, going through the ParseCache
+    when one is given
+    """
+    if cache is None:
+        return markdown_to_html_node(markdown)
+
+    node = cache.get(markdown)
+    if node is None:
+        node = markdown_to_html_node(markdown)
+        cache.put(markdown, node)
+    return node
+
+
+@contextmanager
+def map_file(path):
+    """
+    Yields a read-only mmap of path, or b"" for an empty file, which
+    can't be mapped
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield buf
+
+
+def stream_page(from_path, template, dest_path, basepath):
+    """
+    Renders a markdown file into dest_path while reading it, so only the
+    current block and its HTMLNode are held in memory. The file is mapped
+    and only the block being rendered is decoded. Files with CRLF line
+    endings are read line by line instead, which translates them.
+    """
+    with map_file(from_path) as buf:
+        if buf.find(b"\r") == -1:
+            end = buf.find(b"\n")
+            title = extract_title(buf[: end if end != -1 else len(buf)].decode())
+            blocks = iter_buffer_blocks(buf)
+            node = ParentNode(tag="div", children=iter_block_nodes(blocks))
+            write_page(dest_path, template, title, node, basepath)
+            return
 
     with open(from_path, "r") as mk:
-        markdown = mk.read()
-        title = extract_title(markdown)
-        html = markdown_to_html_node(markdown).to_html()
-
-    with open(template_path, "r") as tmpl:
-        template = tmpl.read()
-        index = (
-            template.replace("{{ Title }}", title)
-            .replace("{{ Content }}", html)
-            .replace('href="/', 'href="' + basepath)
-            .replace('src="/', 'src="' + basepath)
+        first_line = mk.readline()
+        title = extract_title(first_line)
+        blocks = iter_blocks(chain([first_line], mk))
+        node = ParentNode(tag="div", children=iter_block_nodes(blocks))
+        write_page(dest_path, template, title, node, basepath)
+
+
+def generate_page(from_path, template, dest_path, basepath, cache=None):
+    """
+    Renders one markdown file into dest_path using a compiled Template
+    """
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+
+    if os.path.getsize(from_path) > STREAM_THRESHOLD:
+        stream_page(from_path, template, dest_path, basepath)
+        return
+
+    markdown = read_markdown(from_path)
+    title = extract_title(markdown)
+    node = parse_markdown(markdown, cache)
+    write_page(dest_path, template, title, node, basepath)
+
+
+def body_parts(markdown, node):
+    """
+    Serializes node once with a placeholder basepath and returns the html
+    split at it, so basepath.join(parts) is the body for any basepath.
+    Returns None if the markdown contains the placeholder itself.
+    """
+    if BASEPATH_PLACEHOLDER in markdown:
+        return None
+    return node.to_html(BASEPATH_PLACEHOLDER).split(BASEPATH_PLACEHOLDER)
+
+
+def generate_page_targets(from_path, targets, cache=None):
+    """
+    Parses and serializes one markdown file once and writes it for every
+    (templates, dest_path, basepath) target
+    """
+    dests = ", ".join(dest_path for _, dest_path, _ in targets)
+    print(f"Generating page from {from_path} to {dests}")
+
+    if os.path.getsize(from_path) > STREAM_THRESHOLD:
+        for templates, dest_path, basepath in targets:
+            template = templates.for_page(from_path)
+            stream_page(from_path, template, dest_path, basepath)
+        return
+
+    markdown = read_markdown(from_path)
+    title = extract_title(markdown)
+    node = parse_markdown(markdown, cache)
+    parts = body_parts(markdown, node)
+    for templates, dest_path, basepath in targets:
+        body = basepath.join(parts) if parts else node.to_html(basepath)
+        with open_output(dest_path) as dest:
+            dest.writelines(
+                templates.for_page(from_path).iter_render(Title=title, Content=body)
+            )
+
+
+_worker_templates = None
+_worker_cache = None
+
+
+def init_worker(templates, cache):
+    global _worker_templates, _worker_cache
+    _worker_templates = templates
+    _worker_cache = cache
+
+
+def render_page_job(job):
+    """
+    Process pool worker: renders one page and returns its captured output,
+    error message and cache statistics instead of printing, so the parent
+    can report them in page order
+    """
+    src_path, dest_path, basepath, template_path = job
+    out = io.StringIO()
+    before = (
+        _worker_cache.hits if _worker_cache else 0,
+        block_memo.hits,
+        block_memo.misses,
+        output_stats.written,
+    )
+    try:
+        with redirect_stdout(out):
+            template = _worker_templates.get(template_path)
+            generate_page(src_path, template, dest_path, basepath, _worker_cache)
+    except Exception as e:
+        return out.getvalue(), f"{src_path}: {e}", None
+    stats = {
+        "cache_hit": _worker_cache is not None and _worker_cache.hits > before[0],
+        "memo_hits": block_memo.hits - before[1],
+        "memo_misses": block_memo.misses - before[2],
+        "written": output_stats.written > before[3],
+    }
+    return out.getvalue(), None, stats
+
+
+def generate_pages_parallel(
+    pages, templates, basepath, jobs, *, manifest=None, cache=None
+):
+    """
+    Renders pages across a pool of jobs processes. Every template is
+    compiled here first, so workers receive the compiled TemplateSet
+    once instead of each compiling their own. Output and errors are
+    reported in the same order as a serial build.
+    """
+    tasks = [
+        (src, dest, basepath, templates.for_page(src).path) for src, dest in pages
+    ]
+    chunksize = max(1, len(tasks) // (jobs * 4))
+
+    errors = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(templates, cache)
+    ) as pool:
+        results = pool.map(render_page_job, tasks, chunksize=chunksize)
+        for (src_path, dest_path), (output, error, stats) in zip(pages, results):
+            print(output, end="")
+            if error:
+                errors.append(error)
+                continue
+            block_memo.hits += stats["memo_hits"]
+            block_memo.misses += stats["memo_misses"]
+            output_stats.add(stats["written"])
+            if cache:
+                cache.hits += stats["cache_hit"]
+                cache.misses += not stats["cache_hit"]
+            if manifest:
+                manifest.record("pages", src_path, dest_path)
+
+    if errors:
+        raise Exception(
+            f"{len(errors)} page(s) failed to build:\n" + "\n".join(errors)
+        )
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    *,
+    manifest=None,
+    jobs=1,
+    cache=None,
+    io_workers=0,
+    plan=None,
+):
+    """
+    Renders every page below dir_path_content, or every page of plan.
+    jobs > 1 renders across processes, otherwise io_workers > 0 overlaps
+    file reads and writes with rendering on that many threads.
+    """
+    templates = TemplateSet(template_path, dir_path_content, basepath)
+    if plan is None:
+        plan = plan_build(dir_path_content, None, dest_dir_path)
+        plan.check_collisions()
+    pages = list(plan.pages)
+    if manifest:
+        pages = [
+            (src_path, dest_path)
+            for src_path, dest_path in pages
+            if manifest.needs_build("pages", src_path, dest_path)
+        ]
+    make_dirs(plan.page_dirs)
+
+    if jobs > 1 and len(pages) > 1:
+        generate_pages_parallel(
+            pages, templates, basepath, jobs, manifest=manifest, cache=cache
+        )
+    elif io_workers and pages:
+        from async_build import generate_pages_async
+
+        generate_pages_async(
+            pages, templates, basepath, io_workers, manifest=manifest, cache=cache
+        )
+    else:
+        for src_path, dest_path in pages:
+            template = templates.for_page(src_path)
+            generate_page(src_path, template, dest_path, basepath, cache)
+            if manifest:
+                manifest.record("pages", src_path, dest_path)
+
+    report_stats(cache)
+
+
+def report_stats(cache):
+    if output_stats.written or output_stats.unchanged:
+        print(
+            f"Pages: {output_stats.written} written, "
+            f"{output_stats.unchanged} unchanged"
+        )
+    if block_memo.hits:
+        print(
+            f"Block memo: {block_memo.hits} hits, {block_memo.misses} misses "
+            f"({block_memo.hit_rate():.0%} reuse)"
         )
+    if cache:
+        evicted = cache.evict()
+        print(
+            f"Parse cache: {cache.hits} hits, {cache.misses} misses, "
+            f"{evicted} evicted"
+        )
+
+
+def build_full(
+    static_src,
+    content_src,
+    template_path,
+    dest,
+    basepath,
+    *,
+    jobs=1,
+    strategy="auto",
+    asset_workers=1,
+    cache=None,
+    io_workers=0,
+):
+    """
+    Wipes dest, copies the static assets and renders every page
+    """
+    plan = plan_build(content_src, static_src, dest)
+    plan.check_collisions()
+    move_assets(
+        static_src, dest, strategy=strategy, workers=asset_workers, plan=plan
+    )
+    generate_pages_recursive(
+        content_src,
+        template_path,
+        dest,
+        basepath,
+        jobs=jobs,
+        cache=cache,
+        io_workers=io_workers,
+        plan=plan,
+    )
+
+
+def build_targets(
+    static_src,
+    content_src,
+    template_path,
+    targets,
+    *,
+    strategy="auto",
+    asset_workers=1,
+    cache=None,
+):
+    """
+    Full build into several (dest, basepath) targets at once. Every page
+    is parsed and serialized once, only the basepath differs between the
+    outputs.
+    """
+    plans = [plan_build(content_src, static_src, dest) for dest, _ in targets]
+    plans[0].check_collisions()
+    templates = [
+        TemplateSet(template_path, content_src, basepath) for _, basepath in targets
+    ]
+    for (dest, _), plan in zip(targets, plans):
+        os.makedirs(dest, exist_ok=True)
+        move_assets(
+            static_src, dest, strategy=strategy, workers=asset_workers, plan=plan
+        )
+        make_dirs(plan.page_dirs)
+
+    for i, (src_path, _) in enumerate(plans[0].pages):
+        page_targets = [
+            (target_templates, plan.pages[i][1], basepath)
+            for target_templates, plan, (_, basepath) in zip(templates, plans, targets)
+        ]
+        generate_page_targets(src_path, page_targets, cache)
+
+    report_stats(cache)
+
+
+def build_synced(
+    static_src,
+    content_src,
+    template_path,
+    dest,
+    basepath,
+    *,
+    checksum=False,
+    jobs=1,
+    strategy="auto",
+    asset_workers=1,
+    cache=None,
+    io_workers=0,
+):
+    """
+    Syncs assets in place instead of wiping dest, keeping the html of
+    pages that still have a source, then regenerates every page
+    """
+    plan = plan_build(content_src, static_src, dest)
+    plan.check_collisions()
+    keep = {dest_path for _, dest_path in plan.pages}
+    copied, unchanged, deleted = sync_assets(
+        static_src,
+        dest,
+        checksum=checksum,
+        keep=keep,
+        strategy=strategy,
+        workers=asset_workers,
+        plan=plan,
+    )
+    print(f"Synced assets: {copied} copied, {unchanged} unchanged, {deleted} deleted")
+    generate_pages_recursive(
+        content_src,
+        template_path,
+        dest,
+        basepath,
+        jobs=jobs,
+        cache=cache,
+        io_workers=io_workers,
+        plan=plan,
+    )
+
+
+def build_subset(
+    content_src,
+    template_path,
+    dest,
+    basepath,
+    path_filter,
+    *,
+    jobs=1,
+    cache=None,
+    io_workers=0,
+):
+    """
+    Renders only the pages path_filter selects, without wiping dest or
+    touching the static assets
+    """
+    plan = plan_build(content_src, None, dest, path_filter)
+    plan.check_collisions()
+    if not plan.pages:
+        print("No pages match --only/--exclude")
+        return
+    generate_pages_recursive(
+        content_src,
+        template_path,
+        dest,
+        basepath,
+        jobs=jobs,
+        cache=cache,
+        io_workers=io_workers,
+        plan=plan,
+    )
+
+
+def build_since(
+    static_src,
+    content_src,
+    template_path,
+    dest,
+    basepath,
+    rev,
+    *,
+    jobs=1,
+    strategy="auto",
+    asset_workers=1,
+    cache=None,
+    io_workers=0,
+):
+    """
+    Rebuilds the pages and assets git reports as changed since rev. No
+    state from earlier builds is needed, so this works on fresh
+    checkouts. A changed section template rebuilds its section, a
+    changed template.html or a missing dest everything.
+    """
+    changed = changed_files(rev, [content_src, static_src, template_path])
+    if os.path.normpath(template_path) in changed or not os.path.isdir(dest):
+        reason = f"{template_path} changed" if os.path.isdir(dest) else f"no {dest}"
+        print(f"{reason}, building everything")
+        build_full(
+            static_src,
+            content_src,
+            template_path,
+            dest,
+            basepath,
+            jobs=jobs,
+            strategy=strategy,
+            asset_workers=asset_workers,
+            cache=cache,
+            io_workers=io_workers,
+        )
+        return
+
+    content_prefix = os.path.normpath(content_src) + os.sep
+    static_prefix = os.path.normpath(static_src) + os.sep
+    patterns = []
+    assets = []
+    removed = []
+    for path in changed:
+        if path.startswith(content_prefix):
+            rel_path = os.path.relpath(path, content_src).replace(os.sep, "/")
+            if os.path.basename(path) == TEMPLATE_NAME:
+                section = os.path.dirname(rel_path)
+                patterns.append(glob.escape(section) if section else "*")
+            elif os.path.isfile(path):
+                patterns.append(glob.escape(rel_path))
+            else:
+                removed.append(page_dest_path(path, content_src, dest))
+        elif path.startswith(static_prefix):
+            dest_path = os.path.join(dest, os.path.relpath(path, static_src))
+            if os.path.isfile(path):
+                assets.append((path, dest_path))
+            else:
+                removed.append(dest_path)
+
+    print(
+        f"Changed since {rev}: {len(patterns)} page(s) or section(s), "
+        f"{len(assets)} asset(s), {len(removed)} removed"
+    )
+    for dest_path in removed:
+        if os.path.isfile(dest_path):
+            print(f"Removing {dest_path}")
+            os.remove(dest_path)
+
+    make_dirs(sorted({os.path.dirname(dest_path) for _, dest_path in assets}))
+    run_file_jobs(
+        lambda src_path, dest_path: copy_file(src_path, dest_path, strategy),
+        assets,
+        asset_workers,
+        "copying assets",
+    )
+    if patterns:
+        build_subset(
+            content_src,
+            template_path,
+            dest,
+            basepath,
+            PathFilter(patterns),
+            jobs=jobs,
+            cache=cache,
+            io_workers=io_workers,
+        )
+
+
+def page_dependencies(src_path, templates, static_dir):
+    """
+    Returns the files a page's output is built from besides its source:
+    its template, the closer section templates that don't exist yet and
+    the static images the markdown references
+    """
+    candidates = templates.candidates(src_path)
+    template_path = templates.path_for(src_path)
+    deps = candidates[: candidates.index(template_path) + 1]
+    with open(src_path, "r") as mk:
+        for line in mk:
+            if "![" not in line:
+                continue
+            for _, url in extract_markdown_images(line):
+                if url.startswith("/"):
+                    path = url[1:].split("?")[0].split("#")[0]
+                    deps.append(os.path.join(static_dir, path))
+
+    return list(dict.fromkeys(deps))
+
+
+def load_manifest(static_src, content_src, template_path, dest, basepath):
+    templates = TemplateSet(template_path, content_src, basepath)
+    return BuildManifest.load(
+        dest,
+        {"basepath": basepath},
+        lambda src_path: page_dependencies(src_path, templates, static_src),
+    )
+
+
+def build_incremental(
+    static_src,
+    content_src,
+    template_path,
+    dest,
+    basepath,
+    *,
+    jobs=1,
+    strategy="auto",
+    asset_workers=1,
+    cache=None,
+    io_workers=0,
+):
+    """
+    Rebuilds only the pages and assets whose inputs changed since the
+    last build recorded in dest
+    """
+    plan = plan_build(content_src, static_src, dest)
+    plan.check_collisions()
+    manifest = load_manifest(static_src, content_src, template_path, dest, basepath)
+    os.makedirs(dest, exist_ok=True)
+
+    copy_assets(
+        static_src,
+        dest,
+        manifest=manifest,
+        strategy=strategy,
+        workers=asset_workers,
+        plan=plan,
+    )
+    generate_pages_recursive(
+        content_src,
+        template_path,
+        dest,
+        basepath,
+        manifest=manifest,
+        jobs=jobs,
+        cache=cache,
+        io_workers=io_workers,
+        plan=plan,
+    )
+    manifest.remove_stale()
+    manifest.save()
+    print(f"Skipped {manifest.skipped} unchanged files")
 
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    with open(dest_path, "w") as dest:
-        dest.write(index)
+def plan_incremental(static_src, content_src, template_path, dest, basepath):
+    """
+    Prints what an incremental build would rebuild, copy and remove and
+    why, without writing anything
+    """
+    plan = plan_build(content_src, static_src, dest)
+    for dest_path, sources in plan.collisions:
+        print(f"Collision: {dest_path} from {', '.join(sources)}")
+    manifest = load_manifest(static_src, content_src, template_path, dest, basepath)
+    sections = [
+        ("assets", "copy", plan.assets),
+        ("pages", "rebuild", plan.pages),
+    ]
 
+    counts = {}
+    for section, action, files in sections:
+        counts[section] = 0
+        for src_path, dest_path in files:
+            reason = manifest.stale_reason(section, src_path, dest_path)
+            if reason is None:
+                continue
+            print(f"Would {action} {src_path}: {reason}")
+            manifest.current[section][src_path] = {"dest": dest_path}
+            counts[section] += 1
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for item in os.listdir(dir_path_content):
-        src_path = os.path.join(dir_path_content, item)
-        dest_path = os.path.join(dest_dir_path, item)
+    for dest_path in manifest.stale_outputs():
+        print(f"Would remove {dest_path}")
 
-        if os.path.isdir(src_path):
-            generate_pages_recursive(src_path, template_path, dest_path, basepath)
-        elif os.path.isfile(src_path):
-            dest_filename = item.replace(".md", ".html")
-            dest_path = os.path.join(dest_dir_path, dest_filename)
-            generate_page(src_path, template_path, dest_path, basepath)
+    print(
+        f"{counts['pages']} page(s) and {counts['assets']} asset(s) out of date, "
+        f"{manifest.skipped} unchanged"
+    )
@@ -0,0 +1,31 @@
+import os
+import subprocess
+
+
+def run_git(args, cwd):
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, capture_output=True, check=False
+        )
+    except FileNotFoundError:
+        raise Exception("git is not installed")
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip()
+        raise Exception(f"git {args[0]} failed: {message}")
+    return [path for path in result.stdout.decode().split("\0") if path]
+
+
+def changed_files(rev, paths, cwd="."):
+    """
+    Returns the paths under paths, relative to cwd, that differ between
+    rev and the working tree, including uncommitted and untracked files.
+    Renames are reported as a deletion plus an addition.
+    """
+    diff = run_git(
+        ["diff", "--name-only", "--no-renames", "--relative", "-z", rev, "--", *paths],
+        cwd,
+    )
+    untracked = run_git(
+        ["ls-files", "--others", "--exclude-standard", "-z", "--", *paths], cwd
+    )
+    return sorted(set(os.path.normpath(path) for path in diff + untracked))
@@ -1,21 +1,46 @@
+from template import rewrite_basepath
 from textnode import TextNode, TextType
 
+URL_PROPS = ("href", "src")
+
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, basepath=None):
         raise NotImplementedError
 
-    def props_to_html(self):
+    def iter_html(self, basepath=None):
+        """
+        Yields the html of the node as a stream of string fragments
+        """
+        yield self.to_html(basepath)
+
+    def write_html(self, fp, basepath=None):
+        """
+        Writes the html of the node to a file object without building
+        the whole document in memory
+        """
+        fp.writelines(self.iter_html(basepath))
+
+    def props_to_html(self, basepath=None):
+        """
+        Renders the props as html attributes. Root relative href and src
+        values are prefixed with basepath when one is given.
+        """
         html_str = ""
         if self.props:
             for k in self.props:
-                html_str += f' {k}="{self.props[k]}"'
+                value = self.props[k]
+                if basepath and k in URL_PROPS and value and value.startswith("/"):
+                    value = basepath + value[1:]
+                html_str += f' {k}="{value}"'
 
         return html_str
 
@@ -34,38 +59,54 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def to_html(self, basepath=None):
         if self.value is None:
             raise ValueError("Invalid HMTL: no value")
 
+        value = self.value
+        if basepath and '="/' in value:
+            # raw html in the markdown, such as <a href="/about">, is
+            # prefixed the same way as the href and src props
+            value = rewrite_basepath(value, basepath)
+
         if self.tag is None:
-            return self.value
+            return value
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(basepath)}>{value}</{self.tag}>"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def to_html(self, basepath=None):
         """
         Converts a ParentNode object to html
         """
+        return "".join(self.iter_html(basepath))
+
+    def iter_html(self, basepath=None):
+        """
+        Yields the opening tag, the fragments of every child and the
+        closing tag without concatenating them
+        """
         if self.tag is None:
             raise ValueError("Invalid HMTL: no tag")
 
         if self.children is None:
             raise ValueError("invalid HTML: no children")
 
-        tag_html = ""
+        yield f"<{self.tag}{self.props_to_html(basepath)}>"
         for child in self.children:
-            tag_html += child.to_html()
-
-        return f"<{self.tag}{self.props_to_html()}>{tag_html}</{self.tag}>"
+            yield from child.iter_html(basepath)
+        yield f"</{self.tag}>"
 
 
 def text_node_to_html_node(text_node: TextNode) -> LeafNode:
@@ -1,23 +1,358 @@
+import argparse
 import sys
-from generate_page import move_assets, generate_pages_recursive
+from contextlib import nullcontext
+from generate_page import (
+    build_full,
+    build_incremental,
+    build_since,
+    build_subset,
+    build_synced,
+    build_targets,
+    plan_incremental,
+)
+from async_build import DEFAULT_IO_WORKERS
+from build_plan import PathFilter
+from cache import CACHE_DIR, DEFAULT_MAX_BYTES, ParseCache
+from profiler import BuildProfiler
+from publish import STRATEGIES
+from watch import watch
 
+DEFAULT_ASSET_WORKERS = 4
+
+
+def parse_watch_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py watch",
+        description="Build the site, serve it with live reload and rebuild on changes",
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.025,
+        help="seconds between polls for changes",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_target(value):
+    dest, sep, basepath = value.partition("=")
+    if not sep or not dest or not basepath.startswith("/"):
+        raise argparse.ArgumentTypeError(
+            f"expected DIR=BASEPATH with an absolute basepath, got {value!r}"
+        )
+    return dest, basepath
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Generate the static site",
+        epilog="Use 'main.py watch --help' for the development server.",
+    )
+    parser.add_argument("basepath", nargs="?")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages and assets that changed since the last build",
+    )
+    mode.add_argument(
+        "--since",
+        metavar="REV",
+        help="only rebuild pages and assets that git reports as changed since REV",
+    )
+    mode.add_argument(
+        "--sync",
+        action="store_true",
+        help="sync static assets in place instead of deleting and copying them",
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        default=[],
+        type=parse_target,
+        metavar="DIR=BASEPATH",
+        help="full build into DIR with BASEPATH, may be repeated to render "
+        "every page once for several output roots",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only build pages matching GLOB, relative to content/, may be "
+        "repeated. Other output and the static assets are left in place.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip pages matching GLOB, relative to content/, may be repeated",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print which pages and assets an incremental build would rebuild "
+        "and why, without building",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="with --sync, compare asset contents instead of size and mtime",
+    )
+    parser.add_argument(
+        "--publish",
+        choices=STRATEGIES,
+        default="auto",
+        help="how static assets are written to the output (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--asset-workers",
+        type=int,
+        default=DEFAULT_ASSET_WORKERS,
+        metavar="N",
+        help="copy static assets on N threads (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse parsed pages from an on-disk cache keyed by content hash",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR, metavar="PATH")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        metavar="MB",
+        help="evict least recently used entries above this size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages across N worker processes",
+    )
+    parser.add_argument(
+        "--async-io",
+        type=int,
+        nargs="?",
+        const=DEFAULT_IO_WORKERS,
+        default=0,
+        metavar="N",
+        help="overlap page reads and writes with rendering on N I/O threads "
+        f"(default: {DEFAULT_IO_WORKERS})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build stage and page and write a JSON report",
+    )
+    parser.add_argument(
+        "--profile-report",
+        default="build-profile.json",
+        metavar="PATH",
+        help="where to write the profile report (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest stages and pages to print",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.asset_workers < 1:
+        parser.error("--asset-workers must be at least 1")
+    if (args.only or args.exclude) and (
+        args.incremental or args.sync or args.since or args.dry_run
+    ):
+        parser.error(
+            "--only/--exclude can't be combined with --incremental, --sync, "
+            "--since or --dry-run"
+        )
+    if args.target and (
+        args.incremental
+        or args.sync
+        or args.since
+        or args.only
+        or args.exclude
+        or args.dry_run
+        or args.jobs > 1
+        or args.async_io
+    ):
+        parser.error("--target only supports full single process builds")
+    if args.target and args.basepath is not None:
+        parser.error("--target sets the basepath of each output, drop the basepath")
+    if args.basepath is None:
+        args.basepath = "/"
+    if args.checksum and not args.sync:
+        parser.error("--checksum only applies to --sync")
+    if args.dry_run and (args.sync or args.since):
+        parser.error("--dry-run can't be combined with --sync or --since")
+    if args.async_io < 0:
+        parser.error("--async-io can't be negative")
+    if args.async_io and args.jobs > 1:
+        parser.error("--async-io can't be combined with --jobs")
+    return args
 
-def main():
-    if len(sys.argv) < 2:
-        basepath = "/"
-    else:
-        basepath = sys.argv[1]
 
+def main():
     static_src = "static"
     from_path = "content"
     template_path = "template.html"
     dest_path = "docs"
+
+    argv = sys.argv[1:]
+    if argv and argv[0] == "watch":
+        args = parse_watch_args(argv[1:])
+        try:
+            watch(
+                static_src,
+                from_path,
+                template_path,
+                dest_path,
+                args.basepath,
+                args.port,
+                args.interval,
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
+    args = parse_args(argv)
+    if args.dry_run:
+        try:
+            plan_incremental(
+                static_src, from_path, template_path, dest_path, args.basepath
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
+    basepath = args.basepath
+    jobs = args.jobs
+    asset_workers = args.asset_workers
+    io_workers = args.async_io
+    cache = None
+    if args.cache:
+        cache = ParseCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    profiler = None
+    if args.profile:
+        profiler = BuildProfiler()
+        # stage timings are only meaningful, and only recorded safely, when
+        # pages and assets are handled one at a time
+        ignored = [
+            flag
+            for flag, value, default in (
+                ("--jobs", jobs, 1),
+                ("--asset-workers", asset_workers, DEFAULT_ASSET_WORKERS),
+                ("--async-io", io_workers, 0),
+            )
+            if value != default
+        ]
+        if ignored:
+            print(f"Profiling runs in a single thread, ignoring {', '.join(ignored)}")
+        jobs = asset_workers = 1
+        io_workers = 0
+
     try:
-        move_assets(static_src, dest_path)
-        generate_pages_recursive(from_path, template_path, dest_path, basepath)
+        with profiler.run() if profiler else nullcontext():
+            if args.incremental:
+                build_incremental(
+                    static_src,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    basepath,
+                    jobs=jobs,
+                    strategy=args.publish,
+                    asset_workers=asset_workers,
+                    cache=cache,
+                    io_workers=io_workers,
+                )
+            elif args.target:
+                build_targets(
+                    static_src,
+                    from_path,
+                    template_path,
+                    args.target,
+                    strategy=args.publish,
+                    asset_workers=asset_workers,
+                    cache=cache,
+                )
+            elif args.since:
+                build_since(
+                    static_src,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    basepath,
+                    args.since,
+                    jobs=jobs,
+                    strategy=args.publish,
+                    asset_workers=asset_workers,
+                    cache=cache,
+                    io_workers=io_workers,
+                )
+            elif args.only or args.exclude:
+                # accept content/blog/* as well as blog/*
+                prefix = from_path + "/"
+                path_filter = PathFilter(
+                    [pattern.removeprefix(prefix) for pattern in args.only],
+                    [pattern.removeprefix(prefix) for pattern in args.exclude],
+                )
+                build_subset(
+                    from_path,
+                    template_path,
+                    dest_path,
+                    basepath,
+                    path_filter,
+                    jobs=jobs,
+                    cache=cache,
+                    io_workers=io_workers,
+                )
+            elif args.sync:
+                build_synced(
+                    static_src,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    basepath,
+                    checksum=args.checksum,
+                    jobs=jobs,
+                    strategy=args.publish,
+                    asset_workers=asset_workers,
+                    cache=cache,
+                    io_workers=io_workers,
+                )
+            else:
+                build_full(
+                    static_src,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    basepath,
+                    jobs=jobs,
+                    strategy=args.publish,
+                    asset_workers=asset_workers,
+                    cache=cache,
+                    io_workers=io_workers,
+                )
     except Exception as e:
         print(f"Error: {e}")
 
+    if profiler:
+        print(profiler.report(args.profile_top))
+        profiler.save(args.profile_report)
+        print(f"Profile written to {args.profile_report}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def hash_file(path):
+    """
+    Returns the sha256 hex digest of a file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+# the modules that turn markdown into html, hashed into GENERATOR_VERSION
+RENDERER_SOURCES = ("markdown_functions.py", "htmlnode.py", "textnode.py")
+
+
+def hash_sources(names):
+    """
+    Returns a short digest of the named modules next to this file, so
+    any change to how pages are rendered invalidates manifests and
+    cached parses without a manual version bump
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(hash_file(os.path.join(src_dir, name)).encode())
+
+    return digest.hexdigest()[:12]
+
+
+GENERATOR_VERSION = "0.1.0+" + hash_sources(RENDERER_SOURCES)
+
+
+class BuildManifest:
+    """
+    Records the inputs of the last build so unchanged pages and assets
+    can be skipped on the next one.
+
+    Every page entry is a node of the dependency graph: besides its
+    source it lists the files the output was built from (template,
+    referenced images, as returned by the dependencies callable) and the
+    build parameters. A page is rebuilt exactly when one of those changed.
+    """
+
+    def __init__(self, dest_dir, params, previous=None, dependencies=None):
+        self.dest_dir = dest_dir
+        self.params = params
+        self.previous = previous or {"pages": {}, "assets": {}}
+        self.dependencies = dependencies
+        self.current = {"pages": {}, "assets": {}}
+        self.states = {}
+        self.skipped = 0
+
+    @classmethod
+    def load(cls, dest_dir, params, dependencies=None):
+        """
+        Loads the manifest stored in dest_dir. Everything is rebuilt when
+        the generator version changed.
+        """
+        path = os.path.join(dest_dir, MANIFEST_NAME)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(dest_dir, params, dependencies=dependencies)
+
+        if data.get("version") != GENERATOR_VERSION:
+            return cls(dest_dir, params, dependencies=dependencies)
+
+        previous = {
+            "pages": data.get("pages", {}),
+            "assets": data.get("assets", {}),
+        }
+
+        return cls(dest_dir, params, previous, dependencies)
+
+    def file_state(self, path, previous=None):
+        """
+        Returns the size, mtime and hash of path, or None if it doesn't
+        exist. The hash is reused from previous when size and mtime match,
+        and every path is looked at once per build.
+        """
+        if path in self.states:
+            return self.states[path]
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            state = None
+        else:
+            if (
+                previous
+                and previous["size"] == st.st_size
+                and previous["mtime_ns"] == st.st_mtime_ns
+            ):
+                state = {key: previous[key] for key in ("size", "mtime_ns", "hash")}
+            else:
+                state = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "hash": hash_file(path),
+                }
+
+        self.states[path] = state
+        return state
+
+    def stale_reason(self, section, src_path, dest_path):
+        """
+        Returns why dest_path has to be regenerated from src_path, or None
+        if it is up to date. Size and mtime are checked first, the content
+        hash only when they differ.
+        """
+        entry = self.previous[section].get(src_path)
+        if entry is None:
+            return "new"
+        if entry["dest"] != dest_path:
+            return "output path changed"
+        if not os.path.exists(dest_path):
+            return "output missing"
+
+        if section == "pages":
+            params = entry.get("params", {})
+            for name, value in self.params.items():
+                if params.get(name) != value:
+                    return f"{name} changed"
+
+        state = self.file_state(src_path, entry)
+        if state is None or state["hash"] != entry["hash"]:
+            return "source changed"
+
+        deps = {}
+        for path, previous in entry.get("deps", {}).items():
+            dep = self.file_state(path, previous)
+            if previous is None and dep is not None:
+                return f"{path} created"
+            if previous is not None and dep is None:
+                return f"{path} removed"
+            if dep is not None and dep["hash"] != previous["hash"]:
+                return f"{path} changed"
+            deps[path] = dep
+
+        entry = dict(entry, **state)
+        if section == "pages":
+            entry["deps"] = deps
+        self.current[section][src_path] = entry
+        self.skipped += 1
+        return None
+
+    def needs_build(self, section, src_path, dest_path):
+        """
+        Returns True if dest_path has to be regenerated from src_path
+        """
+        return self.stale_reason(section, src_path, dest_path) is not None
+
+    def record(self, section, src_path, dest_path):
+        """
+        Records a successfully built output, with the dependencies and
+        build parameters of pages
+        """
+        entry = dict(self.file_state(src_path), dest=dest_path)
+        if section == "pages":
+            deps = self.dependencies(src_path) if self.dependencies else ()
+            entry["deps"] = {path: self.file_state(path) for path in deps}
+            entry["params"] = dict(self.params)
+        self.current[section][src_path] = entry
+
+    def stale_outputs(self):
+        """
+        Returns the outputs whose sources no longer exist
+        """
+        live = {
+            entry["dest"]
+            for section in self.current.values()
+            for entry in section.values()
+        }
+        stale = []
+        for section in ("pages", "assets"):
+            for src_path, entry in self.previous[section].items():
+                if src_path in self.current[section] or entry["dest"] in live:
+                    continue
+                if os.path.isfile(entry["dest"]):
+                    stale.append(entry["dest"])
+        return stale
+
+    def remove_stale(self):
+        """
+        Deletes outputs whose sources no longer exist
+        """
+        for dest_path in self.stale_outputs():
+            print(f"Removing stale output {dest_path}")
+            os.remove(dest_path)
+
+    def save(self):
+        data = {
+            "version": GENERATOR_VERSION,
+            "params": self.params,
+            "pages": self.current["pages"],
+            "assets": self.current["assets"],
+        }
+        path = os.path.join(self.dest_dir, MANIFEST_NAME)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
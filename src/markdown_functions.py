@@ -1,9 +1,71 @@
 import re
+from collections import OrderedDict
 from enum import Enum
 from textnode import TextNode, TextType
 from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node
 
 
+INLINE_TOKEN = re.compile(r"!\[|\[|\*\*|_|`")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^)]+)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^)]+)\)")
+EXTRACT_IMAGE_PATTERN = re.compile(r"!\[(.+?)?\]\((.+?)\)")
+EXTRACT_LINK_PATTERN = re.compile(r"\[(.+?)?\]\((.+?)\)")
+SPLIT_IMAGE_PATTERN = re.compile(r"(!\[.+?\]\(.+?\))")
+SPLIT_LINK_PATTERN = re.compile(r"(\[.+?\]\(.+?\))")
+HEADING_PATTERN = re.compile(r"#{1,6}\s[\w\s]+")
+OLIST_MARKER_PATTERN = re.compile(r"\d\.\s")
+INLINE_DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+
+class BlockMemo:
+    """
+    Bounded LRU of markdown block text to the HTMLNode it renders to, so
+    boilerplate blocks repeated across pages are parsed once per process.
+    Cached nodes are shared between pages and must not be mutated.
+    """
+
+    def __init__(self, max_entries=4096, max_block_size=4096):
+        self.max_entries = max_entries
+        self.max_block_size = max_block_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, block):
+        node = self.entries.get(block)
+        if node is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(block)
+        self.hits += 1
+        return node
+
+    def put(self, block, node):
+        if len(block) > self.max_block_size:
+            return
+
+        self.entries[block] = node
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+block_memo = BlockMemo()
+
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -41,7 +103,7 @@ def extract_markdown_images(text):
     """
     Extracts and returns the alt text and url from markdown images.
     """
-    matches = re.findall(r"!\[(.+?)?\]\((.+?)\)", text)
+    matches = EXTRACT_IMAGE_PATTERN.findall(text)
 
     return matches
 
@@ -50,7 +112,7 @@ def extract_markdown_links(text):
     """
     Extracts and returns the anchor text and url from markdown links.
     """
-    matches = re.findall(r"\[(.+?)?\]\((.+?)\)", text)
+    matches = EXTRACT_LINK_PATTERN.findall(text)
 
     return matches
 
@@ -70,7 +132,7 @@ def split_nodes_image(old_nodes):
         if not imgs:
             new_nodes.append(node)
         else:
-            sections = re.split(r"(!\[.+?\]\(.+?\))", node.text)
+            sections = SPLIT_IMAGE_PATTERN.split(node.text)
             for section in sections:
                 if not section:
                     continue
@@ -99,7 +161,7 @@ def split_nodes_link(old_nodes):
         if not links:
             new_nodes.append(node)
         else:
-            sections = re.split(r"(\[.+?\]\(.+?\))", node.text)
+            sections = SPLIT_LINK_PATTERN.split(node.text)
             for section in sections:
                 if not section:
                     continue
@@ -115,52 +177,169 @@ def split_nodes_link(old_nodes):
 
 def text_to_textnodes(text):
     """
-    Converts markdown text to a list of TextNode objects
+    Converts markdown text to a list of TextNode objects in a single
+    left to right scan. The outermost span wins: delimiters inside a
+    code, bold or italic span and inside link or image text are kept
+    as literal text.
     """
-    bold_spliter = split_nodes_delimiter(
-        [TextNode(text, TextType.TEXT)], "**", TextType.BOLD
-    )
-    italic_splitter = split_nodes_delimiter(bold_spliter, "_", TextType.ITALIC)
-    code_splitter = split_nodes_delimiter(italic_splitter, "`", TextType.CODE)
-    image_splitter = split_nodes_image(code_splitter)
-    link_splitter = split_nodes_link(image_splitter)
+    nodes = []
+    start = 0
+    pos = 0
+
+    while True:
+        match = INLINE_TOKEN.search(text, pos)
+        if match is None:
+            break
+
+        token = match.group()
+        at = match.start()
+        if token in INLINE_DELIMITERS:
+            end = text.find(token, match.end())
+            if end == -1:
+                raise Exception("Unclosed delimiter.")
+            if at > start:
+                nodes.append(TextNode(text[start:at], TextType.TEXT))
+            nodes.append(TextNode(text[match.end() : end], INLINE_DELIMITERS[token]))
+            start = pos = end + len(token)
+            continue
+
+        if token == "![":
+            found = IMAGE_PATTERN.match(text, at)
+            text_type = TextType.IMAGE
+        else:
+            found = LINK_PATTERN.match(text, at)
+            text_type = TextType.LINK
+        if found is None:
+            pos = at + 1
+            continue
 
-    return link_splitter
+        if at > start:
+            nodes.append(TextNode(text[start:at], TextType.TEXT))
+        nodes.append(TextNode(found.group(1), text_type, found.group(2)))
+        start = pos = found.end()
 
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
 
-def markdown_to_blocks(markdown):
+    return nodes
+
+
+def toggles_fence(line):
     """
-    Splits a markdown text to a list of markdown blocks
+    True when a line opens or closes a ``` code fence
     """
-    blocks = markdown.split("\n\n")
+    line = line.lstrip()
+    return line.startswith("```") and line.count("```") % 2 == 1
 
-    stripped_blocks = []
-    for block in blocks:
-        if block == "":
+
+def fence_toggles(text):
+    if "```" not in text:
+        return 0
+    return sum(1 for line in text.split("\n") if toggles_fence(line))
+
+
+def join_fenced(pieces):
+    """
+    Yields stripped blocks from text split on blank lines, joining the
+    pieces of a ``` fence that contains blank lines back together
+    """
+    fence = []
+    for block in pieces:
+        if fence:
+            fence.append(block)
+            if fence_toggles(block) % 2:
+                yield "\n\n".join(fence).strip()
+                fence = []
             continue
         block = block.strip()
-        stripped_blocks.append(block)
+        if block == "":
+            continue
+        if fence_toggles(block) % 2:
+            fence.append(block)
+            continue
+        yield block
 
-    return stripped_blocks
+    if fence:
+        yield "\n\n".join(fence).strip()
+
+
+def markdown_to_blocks(markdown):
+    """
+    Splits a markdown text to a list of markdown blocks. Blank lines
+    inside a ``` fence do not end the block.
+    """
+    return list(join_fenced(markdown.split("\n\n")))
+
+
+def split_buffer(buf, separator=b"\n\n"):
+    start = 0
+    while True:
+        end = buf.find(separator, start)
+        if end == -1:
+            yield buf[start:]
+            return
+        yield buf[start:end]
+        start = end + len(separator)
+
+
+def iter_buffer_blocks(buf, encoding="utf-8"):
+    """
+    Yields the same blocks as markdown_to_blocks from a bytes-like buffer,
+    such as an mmap, decoding only one block at a time
+    """
+    return join_fenced(piece.decode(encoding) for piece in split_buffer(buf))
+
+
+def iter_blocks(lines):
+    """
+    Yields the same blocks as markdown_to_blocks from an iterable of
+    lines, such as an open file, holding only the current block in memory
+    """
+    block = []
+    in_fence = False
+    for line in lines:
+        if not in_fence and line == "\n":
+            if block:
+                text = "".join(block).strip()
+                if text:
+                    yield text
+                block = []
+            continue
+        if toggles_fence(line):
+            in_fence = not in_fence
+        block.append(line)
+
+    text = "".join(block).strip()
+    if text:
+        yield text
 
 
 def block_to_block_type(block):
     """
-    Assigns a markdown block to a BlockType enum
-    """
-    lines = block.splitlines()
-    if re.match(r"#{1,6}\s[\w\s]+", block):
-        return BlockType.HEADING
-    elif re.match(r"`{3}([\s\S]*?)`{3}", block):
-        return BlockType.CODE
-    elif all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    elif all(line.startswith("- ") for line in lines):
-        return BlockType.ULIST
-    elif all(line.startswith(f"{i}. ") for i, line in enumerate(lines, start=1)):
-        return BlockType.OLIST
-    else:
-        return BlockType.PARAGRAPH
+    Assigns a markdown block to a BlockType enum. Dispatches on the first
+    character, so a block is checked against at most one block type and
+    its lines are scanned at most once.
+    """
+    first = block[:1]
+    if first == "#":
+        if HEADING_PATTERN.match(block):
+            return BlockType.HEADING
+    elif first == "`":
+        if block.startswith("```") and block.find("```", 3) != -1:
+            return BlockType.CODE
+    elif first == ">" or not block:
+        # an empty block has no lines, so every line of it is a quote line
+        if all(line.startswith(">") for line in block.splitlines()):
+            return BlockType.QUOTE
+    elif first == "-":
+        if all(line.startswith("- ") for line in block.splitlines()):
+            return BlockType.ULIST
+    elif first == "1":
+        lines = enumerate(block.splitlines(), start=1)
+        if all(line.startswith(f"{i}. ") for i, line in lines):
+            return BlockType.OLIST
+
+    return BlockType.PARAGRAPH
 
 
 def block_to_parent_node(block, block_type):
@@ -218,7 +397,7 @@ def process_olist_block(block):
     lines = block.split("\n")
     leafnodes = []
     for line in lines:
-        line = re.sub(r"\d\.\s", "", line)
+        line = OLIST_MARKER_PATTERN.sub("", line)
         line_textnodes = text_to_textnodes(line)
         line_leafnodes = list(map(text_node_to_html_node, line_textnodes))
         leafnodes.append(ParentNode("li", line_leafnodes))
@@ -258,23 +437,44 @@ def code_to_textnode(block):
     return TextNode(block, TextType.CODE)
 
 
-def markdown_to_html_node(markdown):
+def block_to_html_node(block):
     """
-    Splits markdown text to blocks and converts it to HTMLNodes
+    Converts a single markdown block to its HTMLNode
     """
-    mk_blocks = markdown_to_blocks(markdown)
-    block_nodes = []
-    for block in mk_blocks:
-        block_type = block_to_block_type(block)
-        block_node = block_to_parent_node(block, block_type)
+    block_type = block_to_block_type(block)
+    block_node = block_to_parent_node(block, block_type)
 
-        if block_type != BlockType.CODE:
-            block_node.children = text_to_children(block, block_type)
-        else:
-            code_textnode = code_to_textnode(block)
-            child_code_node = text_node_to_html_node(code_textnode)
-            block_node = ParentNode(tag="pre", children=[child_code_node])
+    if block_type != BlockType.CODE:
+        block_node.children = text_to_children(block, block_type)
+    else:
+        code_textnode = code_to_textnode(block)
+        child_code_node = text_node_to_html_node(code_textnode)
+        block_node = ParentNode(tag="pre", children=[child_code_node])
+
+    return block_node
+
+
+def iter_block_nodes(blocks, memo=block_memo):
+    """
+    Converts markdown blocks to HTMLNodes one at a time. Blocks already
+    seen by memo reuse their node, pass memo=None to disable.
+    """
+    for block in blocks:
+        block_node = memo.get(block) if memo is not None else None
+        if block_node is None:
+            block_node = block_to_html_node(block)
+            if memo is not None:
+                memo.put(block, block_node)
+
+        yield block_node
 
-        block_nodes.append(block_node)
+
+def markdown_to_html_node(markdown, memo=block_memo):
+    """
+    Splits markdown text to blocks and converts it to HTMLNodes. Blocks
+    already seen by memo reuse their node, pass memo=None to disable.
+    """
+    mk_blocks = markdown_to_blocks(markdown)
+    block_nodes = list(iter_block_nodes(mk_blocks, memo))
 
     return ParentNode(tag="div", children=block_nodes)
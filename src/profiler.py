@@ -0,0 +1,182 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+import generate_page
+import markdown_functions
+
+
+def text_size(args, result):
+    return len(args[0])
+
+
+def result_size(args, result):
+    return len(result)
+
+
+# (module, function name, stage name, bytes processed)
+INSTRUMENTED = [
+    (markdown_functions, "markdown_to_blocks", "markdown_to_blocks", text_size),
+    (markdown_functions, "block_to_block_type", "block_to_block_type", text_size),
+    (markdown_functions, "text_to_textnodes", "text_to_textnodes", text_size),
+    (generate_page, "read_markdown", "read", result_size),
+    (generate_page, "markdown_to_html_node", "parse", text_size),
+    (
+        generate_page,
+        "stream_page",
+        "stream",
+        lambda args, result: os.path.getsize(args[0]),
+    ),
+    (
+        generate_page,
+        "write_page",
+        "serialize_write",
+        lambda args, result: os.path.getsize(args[0]),
+    ),
+    (
+        generate_page,
+        "copy_file",
+        "copy_assets",
+        lambda args, result: os.path.getsize(args[1]),
+    ),
+]
+
+
+class BuildProfiler:
+    """
+    Collects wall time, call counts and bytes processed per build stage
+    and per page, alongside a cProfile of the whole build.
+
+    The parse stage includes markdown_to_blocks, block_to_block_type and
+    text_to_textnodes. serialize_write covers HTMLNode.iter_html and the
+    file write, which are streamed together. Pages above the streaming
+    threshold read, parse and write inside the stream stage instead.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.pages = {}
+        self.page = None
+        self.profile = cProfile.Profile()
+
+    def add(self, name, elapsed, nbytes):
+        stats = self.stages.setdefault(name, {"time": 0.0, "calls": 0, "bytes": 0})
+        stats["time"] += elapsed
+        stats["calls"] += 1
+        stats["bytes"] += nbytes
+
+        if self.page is not None and name != "page":
+            page = self.pages.setdefault(
+                self.page, {"time": 0.0, "bytes": 0, "stages": {}}
+            )
+            page["stages"][name] = page["stages"].get(name, 0.0) + elapsed
+
+    def wrap(self, name, func, measure):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.add(name, time.perf_counter() - start, measure(args, result))
+            return result
+
+        return wrapper
+
+    def wrap_page(self, func):
+        def wrapper(from_path, *args, **kwargs):
+            self.page = from_path
+            start = time.perf_counter()
+            try:
+                return func(from_path, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nbytes = os.path.getsize(from_path)
+                self.add("page", elapsed, nbytes)
+                page = self.pages.setdefault(
+                    from_path, {"time": 0.0, "bytes": 0, "stages": {}}
+                )
+                page["time"] += elapsed
+                page["bytes"] += nbytes
+                self.page = None
+
+        return wrapper
+
+    @contextmanager
+    def run(self):
+        """
+        Instruments the build stages and enables cProfile for the duration
+        """
+        originals = [
+            (module, attr, getattr(module, attr)) for module, attr, _, _ in INSTRUMENTED
+        ]
+        originals.append((generate_page, "generate_page", generate_page.generate_page))
+        for module, attr, name, measure in INSTRUMENTED:
+            setattr(module, attr, self.wrap(name, getattr(module, attr), measure))
+        generate_page.generate_page = self.wrap_page(generate_page.generate_page)
+
+        self.profile.enable()
+        try:
+            yield self
+        finally:
+            self.profile.disable()
+            for module, attr, func in originals:
+                setattr(module, attr, func)
+
+    def slowest_stages(self, top):
+        stages = sorted(self.stages.items(), key=lambda s: s[1]["time"], reverse=True)
+        return stages[:top]
+
+    def slowest_pages(self, top):
+        pages = sorted(self.pages.items(), key=lambda p: p[1]["time"], reverse=True)
+        return pages[:top]
+
+    def report(self, top=10):
+        lines = [f"{'stage':<22} {'time (ms)':>10} {'calls':>8} {'bytes':>12}"]
+        for name, stats in self.slowest_stages(top):
+            lines.append(
+                f"{name:<22} {stats['time'] * 1000:>10.2f} "
+                f"{stats['calls']:>8} {stats['bytes']:>12}"
+            )
+
+        lines.append("")
+        lines.append(f"{'page':<50} {'time (ms)':>10} {'bytes':>12}")
+        for path, stats in self.slowest_pages(top):
+            lines.append(
+                f"{path:<50} {stats['time'] * 1000:>10.2f} {stats['bytes']:>12}"
+            )
+
+        return "\n".join(lines)
+
+    def save(self, report_path, top=50):
+        """
+        Writes the JSON report to report_path and the raw cProfile dump,
+        loadable by pstats, snakeviz or flameprof, next to it
+        """
+        prof_path = os.path.splitext(report_path)[0] + ".prof"
+        self.profile.dump_stats(prof_path)
+
+        stats = pstats.Stats(prof_path).stats
+        by_cumtime = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        functions = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in by_cumtime[
+            :top
+        ]:
+            functions.append(
+                {
+                    "function": f"{filename}:{line}({func})",
+                    "calls": ncalls,
+                    "tottime": tottime,
+                    "cumtime": cumtime,
+                }
+            )
+
+        data = {
+            "created": time.time(),
+            "stages": self.stages,
+            "pages": self.pages,
+            "functions": functions,
+            "cprofile": prof_path,
+        }
+        with open(report_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
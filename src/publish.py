@@ -0,0 +1,123 @@
+import errno
+import os
+import shutil
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+STRATEGIES = ("auto", "hardlink", "reflink", "copy_file_range", "sendfile", "copy")
+
+# errors meaning "this filesystem or platform can't do that", which make
+# auto fall through to the next strategy instead of failing the build
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EPERM,
+    errno.EBADF,
+}
+
+# (strategy, source device, destination device) pairs auto already saw fail
+_unsupported = set()
+
+
+def reflink(src_fd, dest_fd, size):
+    import fcntl
+
+    fcntl.ioctl(dest_fd, FICLONE, src_fd)
+
+
+def copy_file_range(src_fd, dest_fd, size):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src_fd, dest_fd, size - copied)
+        if sent == 0:
+            break
+        copied += sent
+
+
+def sendfile(src_fd, dest_fd, size):
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dest_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
+
+def copy(src_fd, dest_fd, size):
+    with open(src_fd, "rb", closefd=False) as src, open(
+        dest_fd, "wb", closefd=False
+    ) as dest:
+        shutil.copyfileobj(src, dest)
+
+
+KERNEL_COPIES = {
+    "reflink": reflink,
+    "copy_file_range": copy_file_range,
+    "sendfile": sendfile,
+    "copy": copy,
+}
+AUTO_ORDER = ("reflink", "copy_file_range", "sendfile", "copy")
+
+
+def copy_with(strategy, src_path, tmp_path):
+    with open(src_path, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        with open(tmp_path, "wb") as dest:
+            KERNEL_COPIES[strategy](src.fileno(), dest.fileno(), size)
+    shutil.copystat(src_path, tmp_path)
+
+
+def link(src_path, tmp_path):
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.link(src_path, tmp_path)
+
+
+def publish_file(src_path, dest_path, strategy="auto"):
+    """
+    Publishes src_path at dest_path with the given strategy and returns
+    the strategy that was used. The file is created next to dest_path
+    and moved into place, so an existing dest_path, which may be a
+    hardlink to the source, is never written through.
+
+    auto tries reflink, copy_file_range, sendfile and a plain copy in
+    that order. hardlink is never picked by auto since the published
+    file then shares its inode with the source. When hardlink is asked
+    for but the source can't be linked, for instance across volumes, it
+    falls back through the same order.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown publish strategy: {strategy}")
+
+    tmp_path = f"{dest_path}.publish-tmp"
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    devices = (os.stat(src_path).st_dev, os.stat(dest_dir).st_dev)
+    if strategy == "auto":
+        candidates = AUTO_ORDER
+    elif strategy == "hardlink":
+        candidates = (strategy,) + AUTO_ORDER
+    else:
+        candidates = (strategy,)
+    fallback = len(candidates) > 1
+    for candidate in candidates:
+        if fallback and (candidate, devices) in _unsupported:
+            continue
+        try:
+            if candidate == "hardlink":
+                link(src_path, tmp_path)
+            else:
+                copy_with(candidate, src_path, tmp_path)
+        except (OSError, AttributeError, ImportError) as e:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            unsupported = not isinstance(e, OSError) or e.errno in UNSUPPORTED_ERRNOS
+            if fallback and unsupported and candidate != "copy":
+                _unsupported.add((candidate, devices))
+                continue
+            raise
+        os.replace(tmp_path, dest_path)
+        return candidate
@@ -0,0 +1,114 @@
+import os
+import re
+
+# the placeholders filled per page, any other {{ Name }} is left as is
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+TEMPLATE_NAME = "_template.html"
+
+
+def rewrite_basepath(html, basepath):
+    """
+    Prefixes root relative href and src attributes with basepath
+    """
+    if basepath == "/":
+        return html
+    return html.replace('href="/', 'href="' + basepath).replace(
+        'src="/', 'src="' + basepath
+    )
+
+
+class Template:
+    """
+    A page template parsed once into static segments and named slots.
+    The basepath rewrite is applied to the static segments at compile
+    time, so rendering a page is a single join.
+    """
+
+    def __init__(self, text, basepath="/", path=None):
+        self.path = path
+        self.basepath = basepath
+        self.segments = []
+        self.slots = []
+
+        text = rewrite_basepath(text, basepath)
+        pos = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.segments.append(text[pos : match.start()])
+            self.slots.append(match.group(1))
+            pos = match.end()
+        self.segments.append(text[pos:])
+
+    @classmethod
+    def from_file(cls, path, basepath="/"):
+        with open(path, "r") as tmpl:
+            return cls(tmpl.read(), basepath, path)
+
+    def render(self, **values):
+        return "".join(self.iter_render(**values))
+
+    def iter_render(self, **values):
+        """
+        Yields the static segments and slot values in order. A slot value
+        may be a string or an iterable of string fragments, such as
+        HTMLNode.iter_html(), which is streamed through as is.
+        """
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot not in values:
+                raise Exception(f"Missing value for template slot {slot}")
+            value = values[slot]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield segment
+
+
+class TemplateSet:
+    """
+    Resolves each page to the _template.html in its own directory or the
+    nearest ancestor below content_dir, falling back to default_path.
+    Every template is compiled once, and the set is small enough to be
+    shipped to worker processes as is.
+    """
+
+    def __init__(self, default_path, content_dir, basepath="/"):
+        self.default_path = default_path
+        self.content_dir = content_dir
+        self.basepath = basepath
+        self.compiled = {}
+        self.resolved = {}
+
+    def candidates(self, src_path):
+        """
+        Returns the template paths that could apply to src_path, nearest
+        first, whether they exist or not
+        """
+        rel_dir = os.path.relpath(os.path.dirname(src_path), self.content_dir)
+        parts = [] if rel_dir == os.curdir else rel_dir.split(os.sep)
+        paths = [
+            os.path.join(self.content_dir, *parts[:i], TEMPLATE_NAME)
+            for i in range(len(parts), -1, -1)
+        ]
+        paths.append(self.default_path)
+        return paths
+
+    def path_for(self, src_path):
+        dir_path = os.path.dirname(src_path)
+        if dir_path not in self.resolved:
+            candidates = self.candidates(src_path)
+            self.resolved[dir_path] = next(
+                (path for path in candidates[:-1] if os.path.isfile(path)),
+                self.default_path,
+            )
+        return self.resolved[dir_path]
+
+    def get(self, path):
+        template = self.compiled.get(path)
+        if template is None:
+            template = Template.from_file(path, self.basepath)
+            self.compiled[path] = template
+        return template
+
+    def for_page(self, src_path):
+        return self.get(self.path_for(src_path))
@@ -0,0 +1,83 @@
+import os
+import shutil
+import unittest
+
+from contextlib import redirect_stdout
+from io import StringIO
+
+import generate_page
+from async_build import generate_pages_async
+from build_plan import collect_pages
+from fixtures import TEMPLATE, TempDirTestCase, read, write
+from generate_page import generate_pages_recursive, output_stats
+from markdown_functions import block_memo
+from manifest import BuildManifest
+from template import TemplateSet
+
+
+class TestAsyncBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, TEMPLATE)
+        for i in range(20):
+            write(
+                os.path.join(self.content, f"s{i % 3}", f"p{i}", "index.md"),
+                f"# Page {i}\n\n**{i}** [link](/p{i})\n\n```\na\n\nb\n```",
+            )
+
+    def build(self, **kwargs):
+        shutil.rmtree(self.dest, ignore_errors=True)
+        block_memo.clear()
+        output_stats.clear()
+        out = StringIO()
+        with redirect_stdout(out):
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/base/", **kwargs
+            )
+        pages = collect_pages(self.content, self.dest)
+        return {dest: read(dest) for _, dest in pages}, out.getvalue()
+
+    def test_matches_serial_build(self):
+        serial, serial_out = self.build()
+        overlapped, overlapped_out = self.build(io_workers=4)
+        self.assertEqual(overlapped, serial)
+        self.assertEqual(overlapped_out, serial_out)
+
+    def test_errors_reported_in_page_order(self):
+        write(os.path.join(self.content, "a.md"), "no title")
+        write(os.path.join(self.content, "b.md"), "# B\n\nnot **closed")
+        with self.assertRaises(Exception) as ctx:
+            self.build(io_workers=2)
+        message = str(ctx.exception)
+        self.assertIn("2 page(s) failed to build", message)
+        self.assertLess(message.index("a.md"), message.index("b.md"))
+        built = os.path.join(self.dest, "s0", "p0", "index.html")
+        self.assertTrue(os.path.exists(built))
+
+    def test_records_manifest_and_streams_large_pages(self):
+        manifest = BuildManifest(self.dest, {"basepath": "/"})
+        pages = collect_pages(self.content, self.dest)
+        threshold = generate_page.STREAM_THRESHOLD
+        generate_page.STREAM_THRESHOLD = 0
+        try:
+            with redirect_stdout(StringIO()):
+                generate_pages_async(
+                    pages,
+                    TemplateSet(self.template, self.content),
+                    "/",
+                    2,
+                    manifest=manifest,
+                )
+        finally:
+            generate_page.STREAM_THRESHOLD = threshold
+        for src, dest in pages:
+            self.assertEqual(manifest.current["pages"][src]["dest"], dest)
+            self.assertIn("<pre><code>a\n\nb\n</code></pre>", read(dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
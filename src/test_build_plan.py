@@ -0,0 +1,124 @@
+import os
+import unittest
+
+from build_plan import PathFilter, make_dirs, plan_build
+from fixtures import TempDirTestCase, write
+
+
+class TestBuildPlan(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.content, "blog", "a", "index.md"), "# A")
+        write(os.path.join(self.content, "blog", "_template.html"), "{{ Content }}")
+        write(os.path.join(self.static, "images", "a.png"), "png")
+        write(os.path.join(self.static, "index.css"), "body {}")
+
+    def dest_path(self, *parts):
+        return os.path.join(self.dest, *parts)
+
+    def test_plan(self):
+        plan = plan_build(self.content, self.static, self.dest)
+        self.assertEqual(
+            [dest for _, dest in plan.pages],
+            [self.dest_path("blog", "a", "index.html"), self.dest_path("index.html")],
+        )
+        self.assertEqual(
+            [dest for _, dest in plan.assets],
+            [self.dest_path("images", "a.png"), self.dest_path("index.css")],
+        )
+        self.assertEqual(plan.page_dirs, (self.dest, self.dest_path("blog", "a")))
+        self.assertEqual(plan.asset_dirs, (self.dest_path("images"),))
+        self.assertEqual(plan.collisions, ())
+        plan.check_collisions()
+
+    def test_plan_is_read_only(self):
+        plan = plan_build(self.content, None, self.dest)
+        self.assertEqual(plan.assets, ())
+        self.assertIsInstance(plan.pages, tuple)
+        with self.assertRaises(AttributeError):
+            plan.extra = 1
+
+    def test_collisions(self):
+        page_html = os.path.join(self.content, "blog", "a", "index.html")
+        static_html = os.path.join(self.static, "index.html")
+        write(page_html, "<p>raw</p>")
+        write(static_html, "<p>static</p>")
+        plan = plan_build(self.content, self.static, self.dest)
+        self.assertEqual(
+            plan.collisions,
+            (
+                (
+                    self.dest_path("blog", "a", "index.html"),
+                    (page_html, os.path.join(self.content, "blog", "a", "index.md")),
+                ),
+                (
+                    self.dest_path("index.html"),
+                    (os.path.join(self.content, "index.md"), static_html),
+                ),
+            ),
+        )
+        with self.assertRaises(Exception) as ctx:
+            plan.check_collisions()
+        self.assertIn("2 output path collision(s)", str(ctx.exception))
+
+    def test_make_dirs(self):
+        dirs = [self.dest, self.dest_path("a"), self.dest_path("a", "b")]
+        make_dirs(dirs)
+        make_dirs(dirs)
+        make_dirs([self.dest_path("x", "y", "z")])
+        self.assertTrue(os.path.isdir(self.dest_path("a", "b")))
+        self.assertTrue(os.path.isdir(self.dest_path("x", "y", "z")))
+
+
+class TestPathFilter(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        for rel in (
+            "index.md",
+            "blog/index.md",
+            "blog/2024/post.md",
+            "blog/drafts/wip.md",
+            "docs/guide/index.md",
+        ):
+            write(os.path.join(self.content, *rel.split("/")), "# Page")
+
+    def selected(self, only=(), exclude=()):
+        plan = plan_build(self.content, None, "docs", PathFilter(only, exclude))
+        return [os.path.relpath(src, self.content) for src, _ in plan.pages]
+
+    def test_only(self):
+        blog = ["blog/2024/post.md", "blog/drafts/wip.md", "blog/index.md"]
+        self.assertEqual(self.selected(only=["blog/**"]), blog)
+        self.assertEqual(self.selected(only=["blog"]), blog)
+        self.assertEqual(
+            self.selected(only=["*/index.md"]),
+            ["blog/index.md", "docs/guide/index.md"],
+        )
+        self.assertEqual(
+            self.selected(only=["index.md", "docs/*"]),
+            ["docs/guide/index.md", "index.md"],
+        )
+
+    def test_exclude(self):
+        self.assertEqual(
+            self.selected(only=["blog/*"], exclude=["*/drafts"]),
+            ["blog/2024/post.md", "blog/index.md"],
+        )
+        self.assertEqual(self.selected(exclude=["blog/*", "docs"]), ["index.md"])
+
+    def test_prunes_directories(self):
+        path_filter = PathFilter(["blog/2024/*"], ["docs/*"])
+        self.assertIsNone(path_filter.below("docs"))
+        self.assertIsNone(path_filter.below("about"))
+        self.assertIs(path_filter.below("blog"), path_filter)
+        self.assertEqual(path_filter.below("blog/2024").only, ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from cache import ParseCache
+from fixtures import TempDirTestCase
+from markdown_functions import markdown_to_html_node
+
+
+class TestParseCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "cache"))
+
+    def test_miss_then_hit(self):
+        md = "# Title\n\nSome **bold** [link](/a)"
+        self.assertIsNone(self.cache.get(md))
+        node = markdown_to_html_node(md)
+        self.cache.put(md, node)
+
+        cached = self.cache.get(md)
+        self.assertEqual(cached.to_html("/site/"), node.to_html("/site/"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_different_content_different_entry(self):
+        self.cache.put("# A", markdown_to_html_node("# A"))
+        self.assertIsNone(self.cache.get("# B"))
+
+    def test_renderer_change_is_a_miss(self):
+        self.cache.put("# A", markdown_to_html_node("# A"))
+        with mock.patch("cache.GENERATOR_VERSION", "0.1.0+other"):
+            self.assertIsNone(self.cache.get("# A"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        path = self.cache.path_for("# A")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"not a pickle")
+        self.assertIsNone(self.cache.get("# A"))
+
+    def test_evicts_least_recently_used(self):
+        docs = [f"# Page {i}\n\n" + "text " * 200 for i in range(3)]
+        for i, md in enumerate(docs):
+            self.cache.put(md, markdown_to_html_node(md))
+            past = time.time() - 100 + i
+            os.utime(self.cache.path_for(md), (past, past))
+        self.cache.get(docs[0])
+
+        size = os.path.getsize(self.cache.path_for(docs[0]))
+        self.cache.max_bytes = size * 2
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(docs[0]))
+        self.assertIsNone(self.cache.get(docs[1]))
+        self.assertIsNotNone(self.cache.get(docs[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
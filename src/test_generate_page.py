@@ -0,0 +1,488 @@
+import errno
+import os
+import unittest
+from unittest import mock
+
+from contextlib import redirect_stdout
+from io import StringIO
+
+import generate_page
+from build_plan import PathFilter, collect_pages, walk_assets
+from fixtures import TEMPLATE, TempDirTestCase, read, write
+from generate_page import (
+    build_incremental,
+    build_subset,
+    build_targets,
+    body_parts,
+    copy_assets,
+    generate_page_targets,
+    generate_pages_recursive,
+    open_output,
+    output_stats,
+    page_dependencies,
+    plan_incremental,
+    run_file_jobs,
+    stream_page,
+    sync_assets,
+)
+from template import Template, TemplateSet
+
+
+class TestGeneratePages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, TEMPLATE)
+        write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        write(os.path.join(self.content, "blog", "a", "index.md"), "# A\n\n**a**")
+        write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\n_b_")
+
+    def test_collect_pages_sorted(self):
+        pages = collect_pages(self.content, self.dest)
+        self.assertEqual(
+            pages,
+            [
+                (
+                    os.path.join(self.content, "blog", "a", "index.md"),
+                    os.path.join(self.dest, "blog", "a", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "blog", "b", "index.md"),
+                    os.path.join(self.dest, "blog", "b", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.dest, "index.html"),
+                ),
+            ],
+        )
+
+    def test_serial_build(self):
+        generate_pages_recursive(self.content, self.template, self.dest, "/base/")
+        self.assertEqual(
+            read(os.path.join(self.dest, "blog", "a", "index.html")),
+            '<title>A</title><a href="/base/x"><div><h1>A</h1><p><b>a</b></p></div></a>',
+        )
+
+    def test_parallel_matches_serial(self):
+        generate_pages_recursive(self.content, self.template, self.dest, "/")
+        serial = {
+            dest: read(dest) for _, dest in collect_pages(self.content, self.dest)
+        }
+        generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=2)
+        for dest, html in serial.items():
+            self.assertEqual(read(dest), html)
+
+    def test_parallel_reports_errors(self):
+        write(os.path.join(self.content, "broken.md"), "no title")
+        with self.assertRaises(Exception) as ctx:
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/", jobs=2
+            )
+        self.assertIn("broken.md: h1 header missing", str(ctx.exception))
+
+    def test_section_templates(self):
+        write(
+            os.path.join(self.content, "blog", "_template.html"),
+            "<blog>{{ Title }}</blog>{{ Content }}",
+        )
+        self.assertNotIn(
+            os.path.join(self.content, "blog", "_template.html"),
+            [src for src, _ in collect_pages(self.content, self.dest)],
+        )
+        outputs = []
+        for kwargs in ({}, {"jobs": 2}, {"io_workers": 2}):
+            with redirect_stdout(StringIO()):
+                generate_pages_recursive(
+                    self.content, self.template, self.dest, "/", **kwargs
+                )
+            outputs.append(
+                [
+                    read(os.path.join(self.dest, "index.html")),
+                    read(os.path.join(self.dest, "blog", "a", "index.html")),
+                ]
+            )
+        self.assertEqual(
+            outputs[0][1], "<blog>A</blog><div><h1>A</h1><p><b>a</b></p></div>"
+        )
+        self.assertTrue(outputs[0][0].startswith("<title>Home</title>"))
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[2], outputs[0])
+
+    def test_subset_build_leaves_other_output(self):
+        generate_pages_recursive(self.content, self.template, self.dest, "/")
+        home = os.path.join(self.dest, "index.html")
+        write(home, "kept")
+        write(os.path.join(self.content, "blog", "a", "index.md"), "# A2")
+        out = StringIO()
+        with redirect_stdout(out):
+            build_subset(
+                self.content,
+                self.template,
+                self.dest,
+                "/",
+                PathFilter(["blog/*"], ["blog/b"]),
+            )
+        self.assertEqual(read(home), "kept")
+        blog_a = os.path.join(self.dest, "blog", "a", "index.html")
+        self.assertIn("<h1>A2</h1>", read(blog_a))
+        self.assertEqual(out.getvalue().count("Generating page"), 1)
+
+    def test_stream_page_matches_buffered(self):
+        src = os.path.join(self.content, "long.md")
+        write(
+            src,
+            "# Long\n\n"
+            + "para **b**\n\n```\ncode\n\n\nmore\n```\n\n- a\n- b\n\n" * 50,
+        )
+        generate_pages_recursive(self.content, self.template, self.dest, "/base/")
+        dest = os.path.join(self.dest, "long.html")
+        buffered = read(dest)
+        os.remove(dest)
+        template = Template.from_file(self.template, "/base/")
+        stream_page(src, template, dest, "/base/")
+        self.assertEqual(read(dest), buffered)
+
+    def test_stream_page_crlf(self):
+        src = os.path.join(self.content, "crlf.md")
+        with open(src, "wb") as f:
+            f.write(b"# CRLF\r\n\r\n```\r\na\r\n\r\nb\r\n```\r\n\r\n**x**\r\n")
+        dest = os.path.join(self.dest, "crlf.html")
+        stream_page(src, Template(TEMPLATE), dest, "/")
+        self.assertEqual(
+            read(dest),
+            '<title>CRLF</title><a href="/x"><div><h1>CRLF</h1><pre><code>a\n\nb\n'
+            "</code></pre><p><b>x</b></p></div></a>",
+        )
+
+    def test_stream_page_empty_file(self):
+        src = os.path.join(self.content, "empty.md")
+        write(src, "")
+        with self.assertRaises(Exception) as ctx:
+            stream_page(src, Template(TEMPLATE), os.path.join(self.dest, "e"), "/")
+        self.assertEqual(str(ctx.exception), "h1 header missing")
+
+    def test_large_pages_streamed(self):
+        calls = []
+        original = generate_page.stream_page
+        generate_page.stream_page = lambda *args: calls.append(args[0])
+        threshold = generate_page.STREAM_THRESHOLD
+        generate_page.STREAM_THRESHOLD = 10
+        try:
+            with redirect_stdout(StringIO()):
+                generate_pages_recursive(self.content, self.template, self.dest, "/")
+        finally:
+            generate_page.stream_page = original
+            generate_page.STREAM_THRESHOLD = threshold
+        # only index.md is above 10 bytes
+        self.assertEqual(calls, [os.path.join(self.content, "index.md")])
+
+
+class TestBuildTargets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, TEMPLATE)
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n[a](/blog/a) ![i](/i.png)\n\n`href=\"/x\"` text",
+        )
+        write(os.path.join(self.content, "blog", "a.md"), "# A\n\n[home](/)")
+
+    def test_matches_single_target_builds(self):
+        targets = [
+            (os.path.join(self.root, "out", "root"), "/"),
+            (os.path.join(self.root, "out", "gh"), "/site/"),
+        ]
+        out = StringIO()
+        with redirect_stdout(out):
+            build_targets(self.static, self.content, self.template, targets)
+        with redirect_stdout(StringIO()):
+            for dest, basepath in targets:
+                generate_pages_recursive(
+                    self.content, self.template, dest + "-single", basepath
+                )
+        lines = out.getvalue().splitlines()
+        generated = [line for line in lines if line.startswith("Generating page")]
+        self.assertEqual(len(generated), 2)
+        self.assertTrue(
+            generated[0].endswith(
+                ", ".join(os.path.join(dest, "blog", "a.html") for dest, _ in targets)
+            )
+        )
+        for dest, _ in targets:
+            self.assertEqual(read(os.path.join(dest, "index.css")), "body {}")
+            for rel in ("index.html", os.path.join("blog", "a.html")):
+                self.assertEqual(
+                    read(os.path.join(dest, rel)),
+                    read(os.path.join(dest + "-single", rel)),
+                )
+        self.assertIn(
+            '<a href="/site/blog/a">a</a>',
+            read(os.path.join(targets[1][0], "index.html")),
+        )
+        self.assertIn(
+            "<code>href=\"/site/x\"</code>",
+            read(os.path.join(targets[1][0], "index.html")),
+        )
+
+    def test_placeholder_in_markdown_falls_back(self):
+        src = os.path.join(self.content, "nul.md")
+        write(src, "# Nul\n\na \0 b [l](/l)")
+        dest = os.path.join(self.root, "nul.html")
+        with redirect_stdout(StringIO()):
+            generate_page_targets(
+                src, [(TemplateSet(self.template, self.content), dest, "/s/")]
+            )
+        self.assertIn('a \0 b <a href="/s/l">l</a>', read(dest))
+        self.assertIsNone(body_parts("\0", None))
+
+
+class TestOpenOutput(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "out", "page.html")
+        output_stats.clear()
+
+    def output(self, text):
+        with open_output(self.path) as dest:
+            dest.write(text)
+
+    def test_identical_output_left_untouched(self):
+        self.output("<p>a</p>")
+        os.utime(self.path, ns=(0, 0))
+        self.output("<p>a</p>")
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertEqual((output_stats.written, output_stats.unchanged), (1, 1))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def test_identical_output_not_written(self):
+        self.output("<p>a</p>")
+        with mock.patch.object(
+            generate_page.OutputFile, "open_tmp", side_effect=AssertionError
+        ):
+            self.output("<p>a</p>")
+        self.assertEqual(output_stats.unchanged, 1)
+
+    def test_large_output_spills_to_temp_file(self):
+        html = "<p>" + "a" * 100000 + "</p>"
+        with mock.patch.object(generate_page, "STREAM_THRESHOLD", 1000):
+            with open_output(self.path) as dest:
+                dest.writelines(html[i : i + 10] for i in range(0, len(html), 10))
+                self.assertIsNotNone(dest.tmp)
+            self.output(html)
+            self.output(html.replace("a", "b", 1))
+        self.assertEqual(read(self.path), html.replace("a", "b", 1))
+        self.assertEqual((output_stats.written, output_stats.unchanged), (2, 1))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def test_same_size_change_replaced(self):
+        self.output("<p>a</p>")
+        inode = os.stat(self.path).st_ino
+        self.output("<p>b</p>")
+        self.assertEqual(read(self.path), "<p>b</p>")
+        self.assertEqual(output_stats.written, 2)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+        self.assertNotEqual(os.stat(self.path).st_ino, inode)
+
+    def test_failed_write_keeps_previous_output(self):
+        self.output("<p>a</p>")
+        with self.assertRaises(ValueError):
+            with open_output(self.path) as dest:
+                dest.write("<p>partial")
+                raise ValueError("render failed")
+        self.assertEqual(read(self.path), "<p>a</p>")
+        self.assertEqual((output_stats.written, output_stats.unchanged), (1, 0))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["page.html"])
+
+    def test_rebuild_reports_unchanged_pages(self):
+        content = os.path.join(self.tmp.name, "content")
+        dest = os.path.join(self.tmp.name, "docs")
+        template = os.path.join(self.tmp.name, "template.html")
+        write(template, TEMPLATE)
+        write(os.path.join(content, "index.md"), "# Home")
+        write(os.path.join(content, "a.md"), "# A")
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(content, template, dest, "/")
+        write(os.path.join(content, "a.md"), "# B")
+        output_stats.clear()
+        out = StringIO()
+        with redirect_stdout(out):
+            generate_pages_recursive(content, template, dest, "/")
+        self.assertIn("Pages: 1 written, 1 unchanged", out.getvalue())
+
+
+class TestIncrementalBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.image = os.path.join(self.static, "images", "a.png")
+        self.page_a = os.path.join(self.content, "a.md")
+        self.page_b = os.path.join(self.content, "b.md")
+        write(self.template, TEMPLATE)
+        write(self.image, "png")
+        write(self.page_a, "# A\n\n![a](/images/a.png?v=1) ![b](https://x.org/b.png)")
+        write(self.page_b, "# B\n\nno images")
+
+    def build(self, func=build_incremental):
+        out = StringIO()
+        with redirect_stdout(out):
+            func(self.static, self.content, self.template, self.dest, "/")
+        return out.getvalue()
+
+    def test_page_dependencies(self):
+        templates = TemplateSet(self.template, self.content)
+        section_template = os.path.join(self.content, "_template.html")
+        self.assertEqual(
+            page_dependencies(self.page_a, templates, self.static),
+            [section_template, self.template, self.image],
+        )
+        self.assertEqual(
+            page_dependencies(self.page_b, templates, self.static),
+            [section_template, self.template],
+        )
+
+    def test_image_change_rebuilds_referencing_page_only(self):
+        self.build()
+        write(self.image, "new png")
+        out = self.build()
+        self.assertIn(f"Generating page from {self.page_a}", out)
+        self.assertNotIn(f"Generating page from {self.page_b}", out)
+
+    def test_dry_run_reports_reasons_without_writing(self):
+        self.build()
+        write(self.template, "<main>{{ Content }}</main>")
+        os.remove(self.page_b)
+        out = self.build(plan_incremental)
+        self.assertIn(f"Would rebuild {self.page_a}: {self.template} changed", out)
+        self.assertIn(f"Would remove {os.path.join(self.dest, 'b.html')}", out)
+        self.assertIn("1 page(s) and 0 asset(s) out of date, 1 unchanged", out)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "b.html")))
+        self.assertNotIn("<main>", read(os.path.join(self.dest, "a.html")))
+
+
+class TestSyncAssets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.static, "images", "a.png"), "aaaa")
+
+    def test_copies_then_skips(self):
+        self.assertEqual(sync_assets(self.static, self.dest), (2, 0, 0))
+        self.assertEqual(sync_assets(self.static, self.dest), (0, 2, 0))
+        self.assertEqual(read(os.path.join(self.dest, "images", "a.png")), "aaaa")
+
+    def test_changed_file_copied(self):
+        sync_assets(self.static, self.dest)
+        write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(sync_assets(self.static, self.dest), (1, 1, 0))
+        self.assertEqual(
+            read(os.path.join(self.dest, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_checksum_detects_same_size_change(self):
+        sync_assets(self.static, self.dest)
+        dest_png = os.path.join(self.dest, "images", "a.png")
+        st = os.stat(dest_png)
+        write(dest_png, "bbbb")
+        os.utime(dest_png, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(sync_assets(self.static, self.dest), (0, 2, 0))
+        self.assertEqual(sync_assets(self.static, self.dest, checksum=True), (1, 1, 0))
+        self.assertEqual(read(dest_png), "aaaa")
+
+    def test_deletes_orphans_and_keeps_pages(self):
+        page = os.path.join(self.dest, "blog", "index.html")
+        orphan = os.path.join(self.dest, "old", "gone.png")
+        write(page, "<p>page</p>")
+        write(orphan, "x")
+        self.assertEqual(sync_assets(self.static, self.dest, keep={page}), (2, 0, 1))
+        self.assertTrue(os.path.exists(page))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "old")))
+
+    def test_threaded_sync(self):
+        self.assertEqual(sync_assets(self.static, self.dest, workers=4), (2, 0, 0))
+        self.assertEqual(sync_assets(self.static, self.dest, workers=4), (0, 2, 0))
+
+
+class TestCopyAssets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        for i in range(150):
+            write(os.path.join(self.static, f"set{i % 3}", f"{i}.txt"), str(i))
+
+    def test_walk_assets(self):
+        dirs, files = walk_assets(self.static, self.dest)
+        self.assertEqual(
+            sorted(dirs), [os.path.join(self.dest, f"set{i}") for i in range(3)]
+        )
+        self.assertEqual(len(files), 150)
+        self.assertIn(
+            (
+                os.path.join(self.static, "set1", "4.txt"),
+                os.path.join(self.dest, "set1", "4.txt"),
+            ),
+            files,
+        )
+
+    def test_threaded_copy_reports_progress(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            copy_assets(self.static, self.dest, workers=4)
+        for i in range(150):
+            path = os.path.join(self.dest, f"set{i % 3}", f"{i}.txt")
+            self.assertEqual(read(path), str(i))
+        self.assertIn("copying assets: 150/150", out.getvalue())
+
+    def test_run_file_jobs_reports_failures(self):
+        def job(src_path, dest_path):
+            if src_path == "bad":
+                raise OSError("disk on fire")
+            return src_path
+
+        for workers in (1, 3):
+            out = StringIO()
+            with self.subTest(workers=workers), redirect_stdout(out):
+                with self.assertRaises(Exception) as ctx:
+                    files = [("a", "x"), ("bad", "y"), ("c", "z")]
+                    run_file_jobs(job, files, workers, "test")
+                self.assertIsInstance(ctx.exception, OSError)
+                self.assertIn("1 file(s) failed", str(ctx.exception))
+                self.assertIn("Error: test bad -> y: disk on fire", out.getvalue())
+
+    def test_run_file_jobs_keeps_errno(self):
+        def job(src_path, dest_path):
+            if src_path == "bad":
+                raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+            if src_path == "worse":
+                raise ValueError("not an OSError")
+
+        with redirect_stdout(StringIO()):
+            with self.assertRaises(OSError) as ctx:
+                run_file_jobs(job, [("bad", "x")], 1, "copying assets")
+            self.assertEqual(ctx.exception.errno, errno.EOPNOTSUPP)
+            self.assertEqual(
+                ctx.exception.strerror,
+                "1 file(s) failed: copying assets (Operation not supported)",
+            )
+            with self.assertRaises(Exception) as ctx:
+                run_file_jobs(job, [("bad", "x"), ("worse", "y")], 1, "test")
+            self.assertNotIsInstance(ctx.exception, OSError)
+
+
+if __name__ == "__main__":
+    unittest.main()
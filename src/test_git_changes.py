@@ -0,0 +1,101 @@
+import os
+import shutil
+import subprocess
+import unittest
+
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import TempDirTestCase, read, write
+from generate_page import build_full, build_since
+from git_changes import changed_files
+
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestBuildSince(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp.name)
+        write("template.html", TEMPLATE)
+        write(os.path.join("content", "index.md"), "# Home")
+        write(os.path.join("content", "blog", "a.md"), "# A")
+        write(os.path.join("content", "blog", "b.md"), "# B")
+        write(os.path.join("static", "index.css"), "body {}")
+        write(os.path.join("static", "old.css"), "old")
+        self.git("init", "-q")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "initial")
+        with redirect_stdout(StringIO()):
+            build_full("static", "content", "template.html", "docs", "/")
+
+    def git(self, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            check=True,
+            capture_output=True,
+        )
+
+    def since(self, rev="HEAD"):
+        out = StringIO()
+        with redirect_stdout(out):
+            build_since("static", "content", "template.html", "docs", "/", rev)
+        return out.getvalue()
+
+    def test_changed_files(self):
+        write(os.path.join("content", "blog", "a.md"), "# A2")
+        write(os.path.join("content", "new.md"), "# New")
+        os.remove(os.path.join("static", "old.css"))
+        self.assertEqual(
+            changed_files("HEAD", ["content", "static", "template.html"]),
+            [
+                os.path.join("content", "blog", "a.md"),
+                os.path.join("content", "new.md"),
+                os.path.join("static", "old.css"),
+            ],
+        )
+
+    def test_bad_rev(self):
+        with self.assertRaises(Exception) as ctx:
+            changed_files("no-such-rev", ["content"])
+        self.assertIn("git diff failed", str(ctx.exception))
+
+    def test_rebuilds_only_changed_files(self):
+        write(os.path.join("content", "blog", "a.md"), "# A2")
+        write(os.path.join("static", "index.css"), "body { margin: 0 }")
+        os.remove(os.path.join("static", "old.css"))
+        write(os.path.join("docs", "index.html"), "untouched")
+        out = self.since()
+        self.assertIn("1 page(s) or section(s), 1 asset(s), 1 removed", out)
+        self.assertEqual(out.count("Generating page"), 1)
+        self.assertIn("<h1>A2</h1>", read(os.path.join("docs", "blog", "a.html")))
+        self.assertEqual(read(os.path.join("docs", "index.css")), "body { margin: 0 }")
+        self.assertFalse(os.path.exists(os.path.join("docs", "old.css")))
+        self.assertEqual(read(os.path.join("docs", "index.html")), "untouched")
+
+    def test_section_template_rebuilds_section(self):
+        write(os.path.join("content", "blog", "_template.html"), "<b>{{ Content }}</b>")
+        out = self.since()
+        self.assertEqual(out.count("Generating page"), 2)
+        self.assertTrue(read(os.path.join("docs", "blog", "b.html")).startswith("<b>"))
+
+    def test_template_change_builds_everything(self):
+        write("template.html", "<main>{{ Content }}</main>")
+        write(os.path.join("docs", "stray.html"), "gone after the wipe")
+        out = self.since()
+        self.assertIn("template.html changed, building everything", out)
+        self.assertEqual(out.count("Generating page"), 3)
+        self.assertFalse(os.path.exists(os.path.join("docs", "stray.html")))
+
+    def test_committed_changes_since_older_rev(self):
+        write(os.path.join("content", "blog", "b.md"), "# B2")
+        self.git("commit", "-q", "-am", "edit b")
+        self.assertEqual(self.since("HEAD").count("Generating page"), 0)
+        self.assertEqual(self.since("HEAD~1").count("Generating page"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node
 from textnode import TextNode, TextType
+import io
 import unittest
 
 
@@ -70,6 +71,53 @@ class HTMLNodeTest(unittest.TestCase):
             ' href="http://google.com" target="_blank"',
         )
 
+    def test_props_to_html_basepath(self):
+        node = LeafNode("img", "", {"src": "/images/a.png", "alt": "/not-a-url"})
+        self.assertEqual(
+            node.props_to_html("/site/"),
+            ' src="/site/images/a.png" alt="/not-a-url"',
+        )
+        link = LeafNode("a", "x", {"href": "https://example.com/"})
+        self.assertEqual(
+            ParentNode("p", [link]).to_html("/site/"),
+            '<p><a href="https://example.com/">x</a></p>',
+        )
+
+    def test_raw_html_basepath(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode(None, 'see <a href="/about">us</a> <img src="/a.png">'),
+                LeafNode("code", 'src="/x" and href="https://example.com/"'),
+            ],
+        )
+        self.assertEqual(
+            node.to_html("/site/"),
+            '<p>see <a href="/site/about">us</a> <img src="/site/a.png">'
+            '<code>src="/site/x" and href="https://example.com/"</code></p>',
+        )
+        self.assertEqual(node.to_html("/"), node.to_html())
+
+    def test_slots(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_iter_html(self):
+        node = ParentNode(
+            "div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")])]
+        )
+        fragments = list(node.iter_html())
+        self.assertEqual(
+            fragments, ["<div>", "<b>bold</b>", "<p>", "text", "</p>", "</div>"]
+        )
+        self.assertEqual("".join(fragments), node.to_html())
+
+    def test_write_html(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode("a", "x", {"href": "/y"})])])
+        out = io.StringIO()
+        node.write_html(out, "/site/")
+        self.assertEqual(out.getvalue(), '<ul><li><a href="/site/y">x</a></li></ul>')
+
     def test_leaf_to_html_no_props(self):
         node = LeafNode("p", "Hello, world!")
         self.assertEqual(node.to_html(), "<p>Hello, world!</p>")
@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest import mock
+
+import manifest as manifest_module
+from fixtures import TempDirTestCase, write
+from manifest import BuildManifest, hash_file
+
+
+class TestBuildManifest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.dest = os.path.join(self.root, "docs")
+        self.src = os.path.join(self.root, "content", "index.md")
+        self.out = os.path.join(self.dest, "index.html")
+        self.template = os.path.join(self.root, "template.html")
+        self.image = os.path.join(self.root, "static", "a.png")
+        write(self.src, "# Title")
+        write(self.out, "<p>built</p>")
+        write(self.template, "{{ Content }}")
+        write(self.image, "png")
+
+    def load(self, basepath="/"):
+        return BuildManifest.load(
+            self.dest, {"basepath": basepath}, lambda src: [self.template, self.image]
+        )
+
+    def built_manifest(self, basepath="/"):
+        manifest = self.load(basepath)
+        manifest.record("pages", self.src, self.out)
+        manifest.save()
+        return manifest
+
+    def test_new_file_needs_build(self):
+        manifest = self.load()
+        self.assertTrue(manifest.needs_build("pages", self.src, self.out))
+
+    def test_unchanged_file_skipped(self):
+        self.built_manifest()
+        manifest = self.load()
+        self.assertFalse(manifest.needs_build("pages", self.src, self.out))
+        self.assertEqual(manifest.skipped, 1)
+
+    def test_changed_content_rebuilds(self):
+        self.built_manifest()
+        write(self.src, "# Other title")
+        manifest = self.load()
+        self.assertTrue(manifest.needs_build("pages", self.src, self.out))
+
+    def test_touched_but_identical_skipped(self):
+        self.built_manifest()
+        st = os.stat(self.src)
+        os.utime(self.src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        manifest = self.load()
+        self.assertFalse(manifest.needs_build("pages", self.src, self.out))
+
+    def test_basepath_change_rebuilds_pages(self):
+        self.built_manifest()
+        manifest = self.load("/blog/")
+        self.assertEqual(
+            manifest.stale_reason("pages", self.src, self.out), "basepath changed"
+        )
+
+    def test_dependency_change_rebuilds(self):
+        self.built_manifest()
+        write(self.template, "<main>{{ Content }}</main>")
+        self.assertEqual(
+            self.load().stale_reason("pages", self.src, self.out),
+            f"{self.template} changed",
+        )
+
+    def test_dependency_removed_or_created_rebuilds(self):
+        self.built_manifest()
+        os.remove(self.image)
+        manifest = self.load()
+        self.assertEqual(
+            manifest.stale_reason("pages", self.src, self.out),
+            f"{self.image} removed",
+        )
+        manifest.record("pages", self.src, self.out)
+        manifest.save()
+        write(self.image, "png")
+        self.assertEqual(
+            self.load().stale_reason("pages", self.src, self.out),
+            f"{self.image} created",
+        )
+
+    def test_dependencies_not_tracked_for_assets(self):
+        manifest = self.load()
+        manifest.record("assets", self.image, self.out)
+        self.assertNotIn("deps", manifest.current["assets"][self.image])
+
+    def test_missing_output_rebuilds(self):
+        self.built_manifest()
+        os.remove(self.out)
+        manifest = self.load()
+        self.assertTrue(manifest.needs_build("pages", self.src, self.out))
+
+    def test_renderer_change_rebuilds(self):
+        self.built_manifest()
+        with mock.patch.object(manifest_module, "GENERATOR_VERSION", "0.1.0+other"):
+            manifest = self.load()
+        self.assertTrue(manifest.needs_build("pages", self.src, self.out))
+
+    def test_version_tracks_renderer_sources(self):
+        self.assertEqual(
+            manifest_module.GENERATOR_VERSION,
+            "0.1.0+" + manifest_module.hash_sources(manifest_module.RENDERER_SOURCES),
+        )
+
+    def test_remove_stale(self):
+        self.built_manifest()
+        manifest = self.load()
+        manifest.remove_stale()
+        self.assertFalse(os.path.exists(self.out))
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.src), hash_file(self.src))
+        self.assertNotEqual(hash_file(self.src), hash_file(self.out))
+
+
+if __name__ == "__main__":
+    unittest.main()
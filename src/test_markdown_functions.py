@@ -1,3 +1,4 @@
+import io
 import unittest
 from textnode import TextNode, TextType
 from markdown_functions import (
@@ -8,6 +9,8 @@ from markdown_functions import (
     split_nodes_link,
     text_to_textnodes,
     markdown_to_blocks,
+    iter_blocks,
+    iter_buffer_blocks,
     block_to_block_type,
     BlockType,
 )
@@ -544,6 +547,58 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertEqual(nodes, expected)
 
+    def test_code_span_keeps_delimiters(self):
+        """Test delimiters inside a code span are literal"""
+        text = "Use `a_b ** c` here"
+        nodes = text_to_textnodes(text)
+
+        expected = [
+            TextNode("Use ", TextType.TEXT),
+            TextNode("a_b ** c", TextType.CODE),
+            TextNode(" here", TextType.TEXT),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_nested_span_outermost_wins(self):
+        """Test markup nested in bold or italic stays inside the outer span"""
+        text = "_italic with **bold** inside_ and **bold with `code`**"
+        nodes = text_to_textnodes(text)
+
+        expected = [
+            TextNode("italic with **bold** inside", TextType.ITALIC),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("bold with `code`", TextType.BOLD),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_link_url_with_underscores(self):
+        """Test underscores in a link url are not italic delimiters"""
+        text = "See [the docs](https://a.com/some_page_here) now"
+        nodes = text_to_textnodes(text)
+
+        expected = [
+            TextNode("See ", TextType.TEXT),
+            TextNode("the docs", TextType.LINK, "https://a.com/some_page_here"),
+            TextNode(" now", TextType.TEXT),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_literal_brackets(self):
+        """Test brackets and bangs that are not links stay text"""
+        text = "Wow! [not a link] and ![nor an image] [x](u)"
+        nodes = text_to_textnodes(text)
+
+        expected = [
+            TextNode("Wow! [not a link] and ![nor an image] ", TextType.TEXT),
+            TextNode("x", TextType.LINK, "u"),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_unclosed_delimiter(self):
+        """Test an unclosed delimiter raises"""
+        with self.assertRaises(Exception):
+            text_to_textnodes("This is **not closed")
+
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -564,6 +619,39 @@ This is the same paragraph on a new line
             ],
         )
 
+    def test_code_fence_spans_blank_lines(self):
+        md = "Intro\n\n```\nfirst\n\n\nsecond\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["Intro", "```\nfirst\n\n\nsecond\n```", "Outro"],
+        )
+
+    def test_whitespace_only_blocks_dropped(self):
+        self.assertEqual(markdown_to_blocks("a\n\n   \n\n\n\nb"), ["a", "b"])
+
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        cases = [
+            "a\n\n\n\nb\n",
+            "a\n \n\nb\n\n  \n\nc",
+            "```\nx\n\n\n\ny\n```\n\npara",
+            "```\nunclosed\n\nfence",
+            "x ```inline``` y\n\nz",
+        ]
+        for md in cases:
+            with self.subTest(md=md):
+                self.assertEqual(
+                    list(iter_blocks(io.StringIO(md))), markdown_to_blocks(md)
+                )
+                self.assertEqual(
+                    list(iter_buffer_blocks(md.encode())), markdown_to_blocks(md)
+                )
+
+    def test_buffer_blocks_decode_utf8(self):
+        md = "# Título\n\nnaïve — café"
+        self.assertEqual(
+            list(iter_buffer_blocks(md.encode())), ["# Título", "naïve — café"]
+        )
+
 
 class TestBlockToBlockType(unittest.TestCase):
     # Heading tests
@@ -1,6 +1,6 @@
 import unittest
 
-from markdown_functions import markdown_to_html_node
+from markdown_functions import BlockMemo, markdown_to_html_node
 
 
 class TestMarkdownToHTML(unittest.TestCase):
@@ -100,3 +100,32 @@ This is another paragraph with _italic_ text and `code` here
             html,
             "<div><pre><code>> A quote\n> goes here\n \n1. item 1\n2. item 2\n</code></pre></div>",
         )
+
+
+class TestBlockMemo(unittest.TestCase):
+    def test_repeated_blocks_parsed_once(self):
+        memo = BlockMemo()
+        footer = "Licensed under **CC BY** by [us](/about)"
+        first = markdown_to_html_node(f"# One\n\n{footer}", memo)
+        second = markdown_to_html_node(f"# Two\n\n{footer}", memo)
+        self.assertEqual((memo.hits, memo.misses), (1, 3))
+        self.assertIs(first.children[1], second.children[1])
+        self.assertEqual(
+            second.to_html(),
+            '<div><h1>Two</h1><p>Licensed under <b>CC BY</b> by <a href="/about">us</a></p></div>',
+        )
+
+    def test_bounded_lru(self):
+        memo = BlockMemo(max_entries=2)
+        for md in ("a", "b", "a", "c"):
+            markdown_to_html_node(md, memo)
+        self.assertEqual(list(memo.entries), ["a", "c"])
+
+    def test_large_blocks_not_memoized(self):
+        memo = BlockMemo(max_block_size=10)
+        markdown_to_html_node("short\n\n" + "long " * 10, memo)
+        self.assertEqual(list(memo.entries), ["short"])
+
+    def test_disabled(self):
+        node = markdown_to_html_node("text", memo=None)
+        self.assertEqual(node.to_html(), "<div><p>text</p></div>")
@@ -0,0 +1,77 @@
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import generate_page
+import markdown_functions
+from fixtures import TempDirTestCase, write
+from generate_page import generate_pages_recursive
+from markdown_functions import block_memo
+from profiler import BuildProfiler
+
+
+class TestBuildProfiler(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, "{{ Title }}{{ Content }}")
+        write(os.path.join(self.content, "index.md"), "# Home\n\n- a\n- b")
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\ntext")
+        block_memo.clear()
+
+    def build(self, profiler):
+        with redirect_stdout(StringIO()), profiler.run():
+            generate_pages_recursive(
+                self.content, self.template, os.path.join(self.root, "docs"), "/"
+            )
+
+    def test_collects_stages_and_pages(self):
+        profiler = BuildProfiler()
+        self.build(profiler)
+        self.assertEqual(profiler.stages["page"]["calls"], 2)
+        self.assertEqual(profiler.stages["parse"]["calls"], 2)
+        self.assertEqual(profiler.stages["markdown_to_blocks"]["calls"], 2)
+        self.assertEqual(profiler.stages["block_to_block_type"]["calls"], 4)
+        self.assertEqual(
+            set(profiler.pages),
+            {
+                os.path.join(self.content, "index.md"),
+                os.path.join(self.content, "blog", "index.md"),
+            },
+        )
+        self.assertIn("parse", profiler.report())
+
+    def test_run_restores_functions(self):
+        originals = (
+            generate_page.generate_page,
+            generate_page.read_markdown,
+            markdown_functions.text_to_textnodes,
+        )
+        self.build(BuildProfiler())
+        self.assertEqual(
+            originals,
+            (
+                generate_page.generate_page,
+                generate_page.read_markdown,
+                markdown_functions.text_to_textnodes,
+            ),
+        )
+
+    def test_save(self):
+        profiler = BuildProfiler()
+        self.build(profiler)
+        report_path = os.path.join(self.root, "profile.json")
+        profiler.save(report_path)
+        with open(report_path) as f:
+            data = json.load(f)
+        self.assertIn("serialize_write", data["stages"])
+        self.assertTrue(data["functions"])
+        self.assertTrue(os.path.exists(os.path.join(self.root, "profile.prof")))
+
+
+if __name__ == "__main__":
+    unittest.main()
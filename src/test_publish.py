@@ -0,0 +1,101 @@
+import errno
+import os
+import unittest
+from unittest import mock
+
+import publish
+from fixtures import TempDirTestCase, read, write
+from publish import AUTO_ORDER, STRATEGIES, publish_file
+
+
+class TestPublishFile(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.tmp.name, "static", "a.png")
+        self.dest = os.path.join(self.tmp.name, "docs", "a.png")
+        self.data = os.urandom(300_000)
+        write(self.src, self.data)
+        os.makedirs(os.path.dirname(self.dest))
+        self.devices = (
+            os.stat(self.src).st_dev,
+            os.stat(os.path.dirname(self.dest)).st_dev,
+        )
+        publish._unsupported.clear()
+        self.addCleanup(publish._unsupported.clear)
+
+    def test_every_strategy_copies_contents_and_mtime(self):
+        for strategy in STRATEGIES:
+            if strategy == "reflink":
+                continue
+            with self.subTest(strategy=strategy):
+                used = publish_file(self.src, self.dest, strategy)
+                if strategy == "auto":
+                    self.assertIn(used, AUTO_ORDER)
+                else:
+                    self.assertEqual(used, strategy)
+                self.assertEqual(read(self.dest, "rb"), self.data)
+                self.assertEqual(
+                    os.stat(self.dest).st_mtime_ns, os.stat(self.src).st_mtime_ns
+                )
+                self.assertFalse(os.path.exists(self.dest + ".publish-tmp"))
+
+    def test_hardlink_shares_inode(self):
+        publish_file(self.src, self.dest, "hardlink")
+        self.assertTrue(os.path.samefile(self.src, self.dest))
+
+    def test_copy_over_hardlink_leaves_source_intact(self):
+        publish_file(self.src, self.dest, "hardlink")
+        write(os.path.join(self.tmp.name, "other.png"), b"other")
+        publish_file(os.path.join(self.tmp.name, "other.png"), self.dest, "copy")
+        self.assertEqual(read(self.src, "rb"), self.data)
+        self.assertEqual(read(self.dest, "rb"), b"other")
+
+    def failing(self, err):
+        return mock.Mock(side_effect=OSError(err, os.strerror(err)))
+
+    def test_auto_falls_back_and_remembers(self):
+        reflink = self.failing(errno.EXDEV)
+        copy_file_range = self.failing(errno.EOPNOTSUPP)
+        with mock.patch.dict(
+            publish.KERNEL_COPIES, reflink=reflink, copy_file_range=copy_file_range
+        ):
+            self.assertEqual(publish_file(self.src, self.dest), "sendfile")
+            self.assertEqual(publish_file(self.src, self.dest), "sendfile")
+        self.assertEqual((reflink.call_count, copy_file_range.call_count), (1, 1))
+        self.assertEqual(
+            publish._unsupported,
+            {("reflink", self.devices), ("copy_file_range", self.devices)},
+        )
+        self.assertEqual(read(self.dest, "rb"), self.data)
+        self.assertFalse(os.path.exists(self.dest + ".publish-tmp"))
+
+    def test_hardlink_falls_back_across_volumes(self):
+        with mock.patch("publish.os.link", self.failing(errno.EXDEV)) as link:
+            used = publish_file(self.src, self.dest, "hardlink")
+            self.assertEqual(publish_file(self.src, self.dest, "hardlink"), used)
+        self.assertIn(used, AUTO_ORDER)
+        self.assertEqual(link.call_count, 1)
+        self.assertIn(("hardlink", self.devices), publish._unsupported)
+        self.assertFalse(os.path.samefile(self.src, self.dest))
+        self.assertEqual(read(self.dest, "rb"), self.data)
+
+    def test_explicit_strategy_does_not_fall_back(self):
+        failing = self.failing(errno.EOPNOTSUPP)
+        with mock.patch.dict(publish.KERNEL_COPIES, copy_file_range=failing):
+            with self.assertRaises(OSError):
+                publish_file(self.src, self.dest, "copy_file_range")
+        self.assertFalse(os.path.exists(self.dest + ".publish-tmp"))
+
+    def test_other_errors_not_swallowed(self):
+        failing = self.failing(errno.ENOSPC)
+        with mock.patch.dict(publish.KERNEL_COPIES, reflink=failing):
+            with self.assertRaises(OSError):
+                publish_file(self.src, self.dest)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            publish_file(self.src, self.dest, "teleport")
+
+
+if __name__ == "__main__":
+    unittest.main()
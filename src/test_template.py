@@ -0,0 +1,102 @@
+import os
+import pickle
+import unittest
+
+from fixtures import TempDirTestCase, write
+from template import Template, TemplateSet, rewrite_basepath
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render(Title="Home", Content="<p>hi</p>"),
+            "<title>Home</title><main><p>hi</p></main>",
+        )
+
+    def test_segments_and_slots(self):
+        template = Template("a{{ Title }}b{{ Content }}c")
+        self.assertEqual(template.segments, ["a", "b", "c"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_basepath_applied_to_template_only(self):
+        template = Template('<link href="/index.css">{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render(Content='<a href="/raw">x</a>'),
+            '<link href="/site/index.css"><a href="/raw">x</a>',
+        )
+
+    def test_iter_render_streams_fragments(self):
+        template = Template("<main>{{ Content }}</main>")
+        fragments = list(template.iter_render(Content=iter(["<p>", "a", "</p>"])))
+        self.assertEqual(fragments, ["<main>", "<p>", "a", "</p>", "</main>"])
+
+    def test_other_placeholders_left_as_is(self):
+        template = Template('{{ Title }} {{ Date }} <a href="/{{ id }}">', "/site/")
+        self.assertEqual(template.slots, ["Title"])
+        self.assertEqual(
+            template.render(Title="Home"), 'Home {{ Date }} <a href="/site/{{ id }}">'
+        )
+
+    def test_missing_slot_value(self):
+        template = Template("{{ Title }}")
+        with self.assertRaises(Exception):
+            template.render()
+
+    def test_rewrite_basepath(self):
+        self.assertEqual(
+            rewrite_basepath('<img src="/a.png"><a href="/b">', "/x/"),
+            '<img src="/x/a.png"><a href="/x/b">',
+        )
+        self.assertEqual(rewrite_basepath('<a href="/b">', "/"), '<a href="/b">')
+
+
+class TestTemplateSet(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.default = os.path.join(self.tmp.name, "template.html")
+        self.blog = os.path.join(self.content, "blog", "_template.html")
+        for path, text in (
+            (self.default, "default {{ Content }}"),
+            (self.blog, '<a href="/">blog</a> {{ Content }}'),
+        ):
+            write(path, text)
+        self.templates = TemplateSet(self.default, self.content, "/site/")
+
+    def page(self, *parts):
+        return os.path.join(self.content, *parts)
+
+    def test_nearest_ancestor_wins(self):
+        self.assertEqual(self.templates.path_for(self.page("index.md")), self.default)
+        self.assertEqual(self.templates.path_for(self.page("blog", "a.md")), self.blog)
+        self.assertEqual(
+            self.templates.path_for(self.page("blog", "2024", "post", "b.md")),
+            self.blog,
+        )
+
+    def test_candidates_nearest_first(self):
+        self.assertEqual(
+            self.templates.candidates(self.page("blog", "x", "a.md")),
+            [
+                self.page("blog", "x", "_template.html"),
+                self.blog,
+                self.page("_template.html"),
+                self.default,
+            ],
+        )
+
+    def test_compiled_once_with_basepath(self):
+        first = self.templates.for_page(self.page("blog", "a.md"))
+        second = self.templates.for_page(self.page("blog", "x", "b.md"))
+        self.assertIs(first, second)
+        self.assertEqual(first.render(Content="c"), '<a href="/site/">blog</a> c')
+
+    def test_picklable_for_workers(self):
+        self.templates.for_page(self.page("blog", "a.md"))
+        copy = pickle.loads(pickle.dumps(self.templates))
+        self.assertEqual(list(copy.compiled), [self.blog])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+import os
+import shutil
+import sys
+import threading
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from functools import partial
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from fixtures import TempDirTestCase, read, write
+from watch import (
+    LiveReloadHandler,
+    SiteWatcher,
+    TreeMonitor,
+    diff_snapshots,
+    inject_reload_script,
+    scan_tree,
+    RELOAD_SCRIPT,
+)
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+class TestSiteWatcher(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        write(self.template, "<h>{{ Title }}</h>{{ Content }}")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.watcher = SiteWatcher(
+            self.static, self.content, self.template, self.dest, "/"
+        )
+        with redirect_stdout(StringIO()):
+            self.watcher.build()
+        self.addCleanup(self.watcher.close)
+
+    def poll(self):
+        with redirect_stdout(StringIO()):
+            return self.watcher.poll()
+
+    def test_no_changes(self):
+        self.assertEqual(self.poll(), [])
+
+    def test_rerenders_only_changed_page(self):
+        page = os.path.join(self.content, "blog", "index.md")
+        write(page, "# Blog\n\nnew post")
+        bump_mtime(page)
+        self.assertEqual(self.poll(), [page])
+        self.assertEqual(
+            read(os.path.join(self.dest, "blog", "index.html")),
+            "<h>Blog</h><div><h1>Blog</h1><p>new post</p></div>",
+        )
+
+    def test_template_change_refills_cached_bodies(self):
+        write(self.template, "<t>{{ Title }}</t>{{ Content }}")
+        bump_mtime(self.template)
+        self.poll()
+        self.assertEqual(
+            read(os.path.join(self.dest, "index.html")),
+            "<t>Home</t><div><h1>Home</h1></div>",
+        )
+
+    def test_section_template_refills_section_pages(self):
+        section_template = os.path.join(self.content, "blog", "_template.html")
+        write(section_template, "<b>{{ Title }}</b>{{ Content }}")
+        self.assertEqual(self.poll(), [section_template])
+        self.assertEqual(
+            read(os.path.join(self.dest, "blog", "index.html")),
+            "<b>Blog</b><div><h1>Blog</h1></div>",
+        )
+        self.assertEqual(
+            read(os.path.join(self.dest, "index.html")),
+            "<h>Home</h><div><h1>Home</h1></div>",
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, "blog", "_template.html"))
+        )
+
+        os.remove(section_template)
+        self.poll()
+        self.assertEqual(
+            read(os.path.join(self.dest, "blog", "index.html")),
+            "<h>Blog</h><div><h1>Blog</h1></div>",
+        )
+
+    def test_survives_broken_template(self):
+        with open(self.template, "wb") as f:
+            f.write(b"<h>\xff{{ Title }}</h>{{ Content }}")
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(self.watcher.poll(), [self.template])
+        self.assertIn("Error: ", out.getvalue())
+
+        write(self.template, "<t>{{ Title }}</t>{{ Content }}")
+        self.poll()
+        self.assertEqual(
+            read(os.path.join(self.dest, "index.html")),
+            "<t>Home</t><div><h1>Home</h1></div>",
+        )
+
+    def test_build_survives_broken_page(self):
+        write(os.path.join(self.content, "draft.md"), "no title yet")
+        out = StringIO()
+        with redirect_stdout(out):
+            self.watcher.build()
+        self.assertIn("draft.md: h1 header missing", out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+        write(os.path.join(self.content, "draft.md"), "# Draft")
+        self.poll()
+        self.assertEqual(
+            read(os.path.join(self.dest, "draft.html")),
+            "<h>Draft</h><div><h1>Draft</h1></div>",
+        )
+
+    def test_removed_page_and_asset(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        self.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_new_asset_copied(self):
+        write(os.path.join(self.static, "images", "a.png"), "png")
+        self.poll()
+        self.assertEqual(read(os.path.join(self.dest, "images", "a.png")), "png")
+
+
+class TestTreeMonitor(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp.name, "content")
+        write(os.path.join(self.root, "index.md"), "# Home")
+        write(os.path.join(self.root, "blog", "a.md"), "# A")
+
+    def monitor(self):
+        monitor = TreeMonitor(self.root)
+        self.addCleanup(monitor.close)
+        return monitor
+
+    def check_changes(self, monitor):
+        snapshot = monitor.poll()
+        self.assertIs(monitor.poll(), snapshot)
+
+        write(os.path.join(self.root, "index.md"), "# Home!")
+        write(os.path.join(self.root, "new", "deep", "b.md"), "# B")
+        os.rename(os.path.join(self.root, "blog"), os.path.join(self.tmp.name, "old"))
+        changed, removed = diff_snapshots(snapshot, monitor.poll())
+        self.assertEqual(
+            changed,
+            [
+                os.path.join(self.root, "index.md"),
+                os.path.join(self.root, "new", "deep", "b.md"),
+            ],
+        )
+        self.assertEqual(removed, [os.path.join(self.root, "blog", "a.md")])
+
+        # the moved away directory is no longer reported
+        write(os.path.join(self.tmp.name, "old", "c.md"), "# C")
+        self.assertEqual(monitor.poll(), scan_tree(self.root))
+
+    def test_reports_changes(self):
+        self.check_changes(self.monitor())
+
+    def test_uses_inotify_on_linux(self):
+        if not sys.platform.startswith("linux"):
+            self.skipTest("inotify is Linux only")
+        self.assertIsNotNone(self.monitor().inotify)
+
+    def test_falls_back_to_scanning(self):
+        with mock.patch("watch.Inotify", side_effect=OSError("no inotify")):
+            monitor = self.monitor()
+        self.assertIsNone(monitor.inotify)
+        snapshot = monitor.poll()
+        write(os.path.join(self.root, "index.md"), "# Home!")
+        self.assertEqual(
+            diff_snapshots(snapshot, monitor.poll()),
+            ([os.path.join(self.root, "index.md")], []),
+        )
+
+    def test_root_removed_and_recreated(self):
+        monitor = self.monitor()
+        shutil.rmtree(self.root)
+        self.assertEqual(monitor.poll(), {})
+        write(os.path.join(self.root, "index.md"), "# Back")
+        self.assertEqual(list(monitor.poll()), [os.path.join(self.root, "index.md")])
+
+
+class TestLiveReloadHandler(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        write(os.path.join(self.tmp.name, "index.html"), "<body>home</body>")
+        write(os.path.join(self.tmp.name, "index.css"), "body {}")
+        handler = type("Handler", (LiveReloadHandler,), {"basepath": "/ssg/"})
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(handler, directory=self.tmp.name)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(self, path):
+        with urlopen(self.url + path) as response:
+            return response.geturl(), response.read().decode()
+
+    def test_serves_site_below_basepath(self):
+        self.assertEqual(
+            self.get("/ssg/"),
+            (self.url + "/ssg/", f"<body>home{RELOAD_SCRIPT}</body>"),
+        )
+        self.assertEqual(self.get("/ssg/index.css")[1], "body {}")
+        self.assertEqual(self.get("/ssg")[0], self.url + "/ssg/")
+
+    def test_other_prefix_not_stripped(self):
+        with self.assertRaises(HTTPError) as ctx:
+            self.get("/ssgx/index.css")
+        self.assertEqual(ctx.exception.code, 404)
+        ctx.exception.close()
+
+
+class TestWatchHelpers(unittest.TestCase):
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), (["b", "d"], ["c"]))
+
+    def test_inject_reload_script(self):
+        self.assertEqual(
+            inject_reload_script("<body>x</body>"),
+            f"<body>x{RELOAD_SCRIPT}</body>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,515 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import stat
+import struct
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from build_plan import collect_pages, page_dest_path
+from generate_page import extract_title, move_assets, open_output
+from markdown_functions import markdown_to_html_node
+from template import TEMPLATE_NAME, TemplateSet
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = (
+    "<script>new EventSource('"
+    + RELOAD_PATH
+    + "').onmessage = () => location.reload();</script>"
+)
+
+
+def scan_tree(root):
+    """
+    Returns {path: (mtime_ns, size)} for every file below root
+    """
+    snapshot = {}
+    if not os.path.isdir(root):
+        return snapshot
+
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+
+    return snapshot
+
+
+# linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify. Every watched directory
+    reports the names of its entries that were created, written, moved
+    or deleted.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.init1 = libc.inotify_init1
+        self.add_watch = libc.inotify_add_watch
+        self.rm_watch = libc.inotify_rm_watch
+        self.fd = self.init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        self.wds = {}
+
+    def watch(self, dir_path):
+        wd = self.add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch {dir_path}: {os.strerror(err)}")
+        self.dirs[wd] = dir_path
+        self.wds[dir_path] = wd
+
+    def unwatch(self, dir_path):
+        wd = self.wds.pop(dir_path, None)
+        if wd is not None and self.dirs.pop(wd, None) is not None:
+            self.rm_watch(self.fd, wd)
+
+    def read(self):
+        """
+        Returns the paths with pending events, a watched directory itself
+        for events on it, or None if the kernel queue overflowed
+        """
+        paths = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                dir_path = self.dirs.get(wd)
+                if mask & IN_IGNORED and dir_path is not None:
+                    del self.dirs[wd]
+                    if self.wds.get(dir_path) == wd:
+                        del self.wds[dir_path]
+                if dir_path is None:
+                    continue
+                if name:
+                    dir_path = os.path.join(dir_path, os.fsdecode(name))
+                paths.add(dir_path)
+
+        return None if overflow else paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class TreeMonitor:
+    """
+    Keeps a {path: (mtime_ns, size)} snapshot of every file below root
+    up to date. With inotify only the paths it reports are statted
+    again, so an idle poll costs a single non-blocking read whatever the
+    size of the tree. Without it, for instance on other platforms or
+    once the watch limit is reached, every poll rescans the whole tree.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.inotify = None
+        self.snapshot = {}
+        self.dirs = set()
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError, TypeError):
+            pass
+        self.rescan()
+
+    def rescan(self):
+        if self.inotify is None or not os.path.isdir(self.root):
+            self.snapshot = scan_tree(self.root)
+            return
+        self.snapshot = {}
+        self.dirs = set()
+        try:
+            self.add_tree(self.root, self.snapshot)
+        except OSError as e:
+            if e.errno not in (errno.ENOSPC, errno.ENOMEM):
+                raise
+            print(f"inotify unavailable ({e.strerror}), scanning {self.root} instead")
+            self.close()
+            self.inotify = None
+            self.snapshot = scan_tree(self.root)
+
+    def add_tree(self, dir_path, snapshot):
+        """
+        Watches dir_path and every directory below it, then records their
+        files. Watching first means no file created meanwhile is missed.
+        """
+        self.inotify.watch(dir_path)
+        self.dirs.add(dir_path)
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.add_tree(entry.path, snapshot)
+                elif entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+
+    def remove_tree(self, dir_path, snapshot):
+        prefix = dir_path + os.sep
+        for path in [path for path in snapshot if path.startswith(prefix)]:
+            del snapshot[path]
+        for path in [path for path in self.dirs if path.startswith(prefix)]:
+            self.dirs.discard(path)
+            self.inotify.unwatch(path)
+        self.dirs.discard(dir_path)
+        self.inotify.unwatch(dir_path)
+
+    def poll(self):
+        """
+        Returns the current snapshot. It is a new dict when something
+        changed, and the previous one otherwise.
+        """
+        if self.inotify is None or not self.dirs:
+            self.rescan()
+            return self.snapshot
+
+        paths = self.inotify.read()
+        if paths is None:
+            self.rescan()
+            return self.snapshot
+        if not paths:
+            return self.snapshot
+
+        snapshot = dict(self.snapshot)
+        for path in sorted(paths):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+            is_dir = st is not None and stat.S_ISDIR(st.st_mode)
+            if path in self.dirs and not is_dir:
+                self.remove_tree(path, snapshot)
+            if st is None:
+                snapshot.pop(path, None)
+            elif is_dir:
+                if path not in self.dirs:
+                    self.add_tree(path, snapshot)
+            elif stat.S_ISREG(st.st_mode):
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        self.snapshot = snapshot
+        return snapshot
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+def diff_snapshots(old, new):
+    """
+    Returns the sorted paths that were added or modified, and those removed
+    """
+    if old is new:
+        return [], []
+    changed = sorted(path for path, stat in new.items() if old.get(path) != stat)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+class Reloader:
+    """
+    Counts site rebuilds and wakes up every waiting live reload client
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.cond = threading.Condition()
+
+    def notify(self):
+        with self.cond:
+            self.version += 1
+            self.cond.notify_all()
+
+    def wait(self, version, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class SiteWatcher:
+    """
+    Keeps the compiled templates and every rendered page body in memory
+    and re-renders only what changed between two polls
+    """
+
+    def __init__(self, static_src, content_src, template_path, dest, basepath):
+        self.static_src = static_src
+        self.content_src = content_src
+        self.template_path = template_path
+        self.dest = dest
+        self.basepath = basepath
+        self.templates = None
+        self.bodies = {}
+        self.snapshots = {}
+        self.monitors = None
+
+    def build(self):
+        """
+        Full build that fills the in-memory caches
+        """
+        move_assets(self.static_src, self.dest)
+        self.templates = TemplateSet(
+            self.template_path, self.content_src, self.basepath
+        )
+        self.bodies = {}
+        for src_path, dest_path in collect_pages(self.content_src, self.dest):
+            try:
+                self.render_page(src_path, dest_path)
+            except Exception as e:
+                print(f"Error: {src_path}: {e}")
+
+        self.close()
+        self.monitors = {
+            "static": TreeMonitor(self.static_src),
+            "content": TreeMonitor(self.content_src),
+        }
+        self.snapshots = self.scan()
+
+    def close(self):
+        if self.monitors:
+            for monitor in self.monitors.values():
+                monitor.close()
+
+    def scan(self):
+        st = os.stat(self.template_path)
+        return {
+            "static": self.monitors["static"].poll(),
+            "content": self.monitors["content"].poll(),
+            "template": {self.template_path: (st.st_mtime_ns, st.st_size)},
+        }
+
+    def render_page(self, src_path, dest_path):
+        with open(src_path, "r") as mk:
+            markdown = mk.read()
+        title = extract_title(markdown)
+        body = markdown_to_html_node(markdown).to_html(self.basepath)
+        self.bodies[src_path] = (dest_path, title, body)
+        self.write_page(src_path, dest_path, title, body)
+
+    def write_page(self, src_path, dest_path, title, body):
+        template = self.templates.for_page(src_path)
+        with open_output(dest_path) as dest:
+            dest.write(template.render(Title=title, Content=body))
+
+    def refill_pages(self):
+        """
+        Recompiles the templates and refills every cached page body
+        """
+        self.templates = TemplateSet(
+            self.template_path, self.content_src, self.basepath
+        )
+        for src_path, (dest_path, title, body) in self.bodies.items():
+            try:
+                self.write_page(src_path, dest_path, title, body)
+            except Exception as e:
+                print(f"Error: {src_path}: {e}")
+
+    def poll(self):
+        """
+        Applies every change since the last poll and returns the list of
+        changed source paths
+        """
+        snapshots = self.scan()
+        touched = []
+
+        changed, _ = diff_snapshots(self.snapshots["template"], snapshots["template"])
+        changed_content, removed = diff_snapshots(
+            self.snapshots["content"], snapshots["content"]
+        )
+        sections = [
+            path
+            for path in changed_content + removed
+            if os.path.basename(path) == TEMPLATE_NAME
+        ]
+        if changed or sections:
+            for path in changed + sections:
+                print(f"Template {path} changed, refilling all pages")
+            self.refill_pages()
+            touched.extend(changed + sections)
+
+        changed = [path for path in changed_content if path not in sections]
+        removed = [path for path in removed if path not in sections]
+        for src_path in changed:
+            dest_path = page_dest_path(src_path, self.content_src, self.dest)
+            print(f"Generating page from {src_path} to {dest_path}")
+            try:
+                self.render_page(src_path, dest_path)
+            except Exception as e:
+                print(f"Error: {src_path}: {e}")
+        for src_path in removed:
+            dest_path, _, _ = self.bodies.pop(src_path, (None, None, None))
+            if dest_path and os.path.isfile(dest_path):
+                os.remove(dest_path)
+        touched.extend(changed + removed)
+
+        changed, removed = diff_snapshots(self.snapshots["static"], snapshots["static"])
+        for src_path in changed:
+            dest_path = os.path.join(
+                self.dest, os.path.relpath(src_path, self.static_src)
+            )
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.copy(src_path, dest_path)
+        for src_path in removed:
+            dest_path = os.path.join(
+                self.dest, os.path.relpath(src_path, self.static_src)
+            )
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+        touched.extend(changed + removed)
+
+        self.snapshots = snapshots
+        return touched
+
+
+def inject_reload_script(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + RELOAD_SCRIPT
+    return html[:index] + RELOAD_SCRIPT + html[index:]
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the output directory below basepath, adds the live reload
+    script to html pages and streams reload events on RELOAD_PATH
+    """
+
+    reloader = None
+    basepath = "/"
+
+    def translate_path(self, path):
+        """
+        Maps basepath to the output directory, the way the site is laid
+        out once published under it
+        """
+        prefix = self.basepath.rstrip("/")
+        if prefix and path.startswith(prefix):
+            rest = path[len(prefix) :]
+            if not rest or rest[0] in "/?#":
+                path = rest or "/"
+        return super().translate_path(path)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.stream_reloads()
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?")[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+
+        with open(path, "r") as f:
+            body = inject_reload_script(f.read()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        version = self.reloader.version
+        try:
+            while True:
+                new_version = self.reloader.wait(version, timeout=15)
+                if new_version == version:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = new_version
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def watch(
+    static_src, content_src, template_path, dest, basepath, port=8000, interval=0.025
+):
+    """
+    Builds the site, serves dest on port and rebuilds changed pages and
+    assets until interrupted
+    """
+    watcher = SiteWatcher(static_src, content_src, template_path, dest, basepath)
+    watcher.build()
+
+    reloader = Reloader()
+    handler = type(
+        "Handler", (LiveReloadHandler,), {"reloader": reloader, "basepath": basepath}
+    )
+    server = ThreadingHTTPServer(("", port), partial(handler, directory=dest))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {dest} on http://localhost:{port}{basepath}, watching for changes")
+
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                touched = watcher.poll()
+            except Exception as e:
+                print(f"Error: {e}")
+                continue
+            if touched:
+                reloader.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        watcher.close()